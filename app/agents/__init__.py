@@ -1,12 +1,55 @@
 """ADK Agent modules for the Investment Risk Scorer."""
-from .risk_analyzer_agent import risk_analyzer_agent
-from .recommendation_agent import recommendation_agent
-from .scenario_agent import scenario_agent
-from .alert_agent import alert_agent
+import importlib
+from pathlib import Path
+from functools import cache
+
+from dotenv import load_dotenv
+
+
+@cache
+def load_env() -> None:
+    """Load the .env file once per process, however many agent modules ask."""
+    load_dotenv()
+
+
+# Load environment variables before any agent module reads them
+load_env()
+
+# Agent instructions live as markdown files next to the agents
+PROMPTS_DIR = Path(__file__).parent / "prompts"
+
+
+@cache
+def load_instruction(name: str) -> str:
+    """Read an agent's instruction from prompts/<name>.md once per process."""
+    return (PROMPTS_DIR / f"{name}.md").read_text(encoding="utf-8")
+
+
+# Agents are imported on first access (PEP 562) so callers only pay for
+# the ADK modules they actually use. Importing a submodule directly first
+# (e.g. agents.scenario_agent) binds the module under that name as usual;
+# import the agent from its submodule in that case.
+_LAZY_AGENTS = {
+    'risk_analyzer_agent': '.risk_analyzer_agent',
+    'recommendation_agent': '.recommendation_agent',
+    'scenario_agent': '.scenario_agent',
+    'alert_agent': '.alert_agent',
+    'portfolio_agent': '.portfolio_agent',
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_AGENTS:
+        agent = getattr(importlib.import_module(_LAZY_AGENTS[name], __name__), name)
+        globals()[name] = agent
+        return agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = [
     'risk_analyzer_agent',
     'recommendation_agent',
     'scenario_agent',
-    'alert_agent'
+    'alert_agent',
+    'portfolio_agent'
 ]
@@ -0,0 +1,64 @@
+"""
+On-disk cache for raw Alpha Vantage responses.
+Survives restarts and is shared by every worker on the host, so a symbol
+re-analyzed within the TTL never goes back to the network.
+"""
+import os
+import time
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+import orjson
+
+# Where cached quotes live; override with QUOTE_CACHE_DIR
+QUOTE_CACHE_DIR = Path(os.getenv("QUOTE_CACHE_DIR", Path(__file__).resolve().parent.parent / ".cache" / "quotes"))
+
+
+class FileCache:
+    """One JSON file per key, expired by file modification time."""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+
+    def _path(self, key: str) -> Path:
+        # Keys are ticker symbols; keep the file name safe for any input
+        safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in key)
+        return self.directory / f"{safe}.json"
+
+    def get(self, key: str, ttl: float) -> Optional[dict]:
+        """
+        Return the cached value for key if it was written less than ttl seconds ago.
+
+        Args:
+            key: Cache key
+            ttl: Maximum age in seconds
+
+        Returns:
+            The cached value, or None on miss, expiry or an unreadable file
+        """
+        path = self._path(key)
+        try:
+            # Check the age before reading so expired entries are never parsed
+            if os.path.getmtime(path) + ttl < time.time():
+                return None
+            return orjson.loads(path.read_bytes())
+        except (OSError, ValueError):
+            return None
+
+    def set(self, key: str, value: dict) -> None:
+        """Write value for key atomically; a failed write only costs a later cache miss."""
+        tmp = None
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(orjson.dumps(value))
+            os.replace(tmp, self._path(key))
+        except OSError as e:
+            print(f"⚠️ Quote cache write failed for {key}: {e}")
+            if tmp and os.path.exists(tmp):
+                os.unlink(tmp)
+
+
+quote_cache = FileCache(QUOTE_CACHE_DIR)
@@ -2,13 +2,63 @@
 Alert Agent using Google ADK.
 Monitors for rebalancing needs, tax-loss harvesting opportunities, and market alerts.
 """
-import os
+import re
+import json
+import math
+import time
+import hashlib
+import threading
 from datetime import datetime
+from itertools import chain
+from typing import Iterator, Optional
 from google.adk.agents import LlmAgent
-from dotenv import load_dotenv
+from . import load_instruction
 
-# Load environment variables
-load_dotenv()
+# Holdings that trigger a simulated drift alert, matched in one case-insensitive pass
+REBALANCE_WATCHLIST = ("NVDA", "TSLA")
+_WATCHLIST_RE = re.compile("|".join(map(re.escape, REBALANCE_WATCHLIST)), re.IGNORECASE)
+
+# Compiled reports keyed on (portfolio digest, date, profile) -> (expiry, report).
+# Alerts only depend on portfolio content and the calendar date, so polls within
+# the TTL skip the whole pipeline.
+ALERT_CACHE_TTL = 3600
+ALERT_CACHE_MAX_ENTRIES = 1024
+_alert_cache: dict[tuple[str, str, str], tuple[float, dict]] = {}
+_alert_cache_lock = threading.Lock()
+
+# Ordering used when producers drop alerts below a minimum severity
+_SEVERITY_RANK = {"INFO": 0, "LOW": 1, "MEDIUM": 2, "HIGH": 3}
+
+# Static market alerts, shared across calls - treat as read-only
+_TAX_PLANNING_ALERT = {
+    "type": "TAX_PLANNING",
+    "severity": "MEDIUM",
+    "message": "Q4 Tax Planning: Review portfolio for year-end tax optimization",
+    "action": "Consider tax-loss harvesting before Dec 31"
+}
+_REBALANCE_REMINDER_ALERT = {
+    "type": "REBALANCE_REMINDER",
+    "severity": "LOW",
+    "message": "Year-end portfolio review recommended",
+    "action": "Schedule annual portfolio rebalancing"
+}
+_SECTOR_WATCH_ALERT = {
+    "type": "SECTOR_WATCH",
+    "severity": "INFO",
+    "message": "Technology sector exposure detected",
+    "action": "Monitor Fed interest rate decisions that may impact tech valuations"
+}
+_MARKET_UPDATE_ALERT = {
+    "type": "MARKET_UPDATE",
+    "severity": "INFO",
+    "message": "Regular portfolio monitoring recommended",
+    "action": "Review portfolio performance monthly"
+}
+
+
+def _is_visible(alert: dict, min_rank: int) -> bool:
+    """Alerts below the threshold are still shown when they carry a recommendation."""
+    return _SEVERITY_RANK.get(alert["severity"], 0) >= min_rank or "recommend" in alert["message"].lower()
 
 
 def check_rebalancing_need(
@@ -27,6 +77,11 @@ def check_rebalancing_need(
     Returns:
         Dictionary with rebalancing alert details
     """
+    return _check_rebalancing_need(holdings_weights, drift_threshold, datetime.now())
+
+
+def _check_rebalancing_need(holdings_weights: str, drift_threshold: float, now: datetime) -> dict:
+    """Rebalancing check against a caller-supplied clock reading."""
     # For demo purposes, simulate drift detection
     # In production, this would compare actual vs target weights
     
@@ -37,7 +92,7 @@ def check_rebalancing_need(
     max_weight = 0.5  # Maximum weight threshold
     
     # Simulated drift detection
-    if "NVDA" in holdings_weights.upper() or "TSLA" in holdings_weights.upper():
+    if _WATCHLIST_RE.search(holdings_weights):
         needs_rebalancing = True
         alerts.append({
             "type": "POSITION_DRIFT",
@@ -51,7 +106,7 @@ def check_rebalancing_need(
         "drift_threshold": drift_threshold,
         "alerts": alerts,
         "recommendation": "Rebalance quarterly to maintain target allocation" if needs_rebalancing else "Portfolio within acceptable drift range",
-        "last_checked": datetime.now().isoformat()
+        "last_checked": now.isoformat()
     }
 
 
@@ -73,30 +128,35 @@ def detect_tax_loss_harvesting(
         tax_year = datetime.now().year
     
     opportunities = []
+    savings = []  # Summed exactly with math.fsum so totals don't drift
     
     # Simulated tax-loss detection
     # In production, this would analyze actual purchase prices vs current prices
-    if "loss" in holdings_with_gains.lower() or "negative" in holdings_with_gains.lower():
-        opportunities.append({
+    holdings_text = holdings_with_gains.lower()
+    if "loss" in holdings_text or "negative" in holdings_text:
+        opportunity = {
             "type": "TAX_LOSS_HARVEST",
             "stock": "Example Stock",
             "estimated_loss": -2500.00,
             "potential_tax_savings": 625.00,  # Assuming 25% tax bracket
             "action": "Consider selling to realize loss and offset gains",
             "wash_sale_warning": "Wait 31 days before repurchasing to avoid wash sale rules"
-        })
+        }
+        opportunities.append(opportunity)
+        savings.append(opportunity["potential_tax_savings"])
     
     return {
         "tax_year": tax_year,
         "opportunities": opportunities,
-        "total_potential_savings": sum(o.get("potential_tax_savings", 0) for o in opportunities),
+        "total_potential_savings": math.fsum(savings),
         "note": "Consult with a tax professional before making decisions"
     }
 
 
 def generate_market_alerts(
     portfolio_sectors: str,
-    market_conditions: str = "normal"
+    market_conditions: str = "normal",
+    min_severity: str = "INFO"
 ) -> dict:
     """
     Generate market-context alerts relevant to the portfolio.
@@ -104,56 +164,51 @@ def generate_market_alerts(
     Args:
         portfolio_sectors: JSON string of sectors represented in portfolio
         market_conditions: Current market conditions ('bull', 'bear', 'volatile', 'normal')
+        min_severity: Lowest severity to emit ('INFO', 'LOW', 'MEDIUM', 'HIGH')
         
     Returns:
         Dictionary with market alerts
     """
-    alerts = []
+    return _generate_market_alerts(portfolio_sectors, market_conditions, datetime.now(), min_severity)
+
+
+def _generate_market_alerts(
+    portfolio_sectors: str,
+    market_conditions: str,
+    now: datetime,
+    min_severity: str = "INFO"
+) -> dict:
+    """Market alert generation against a caller-supplied clock reading."""
+    alerts = list(_iter_market_alerts(portfolio_sectors, now, _SEVERITY_RANK.get(min_severity.upper(), 0)))
     
+    return {
+        "market_conditions": market_conditions,
+        "timestamp": now.isoformat(),
+        "alerts": alerts,
+        "priority_alerts": [a for a in alerts if a.get("severity") in ["HIGH", "MEDIUM"]]
+    }
+
+
+def _iter_market_alerts(portfolio_sectors: str, now: datetime, min_rank: int) -> Iterator[dict]:
+    """Yield the visible market alerts lazily."""
     # Add time-based alerts
-    current_month = datetime.now().month
+    current_month = now.month
     
     # Q4 tax planning reminder
-    if current_month >= 10:
-        alerts.append({
-            "type": "TAX_PLANNING",
-            "severity": "MEDIUM",
-            "message": "Q4 Tax Planning: Review portfolio for year-end tax optimization",
-            "action": "Consider tax-loss harvesting before Dec 31"
-        })
+    if current_month >= 10 and _is_visible(_TAX_PLANNING_ALERT, min_rank):
+        yield _TAX_PLANNING_ALERT
     
     # End-of-year rebalancing
-    if current_month == 12:
-        alerts.append({
-            "type": "REBALANCE_REMINDER",
-            "severity": "LOW",
-            "message": "Year-end portfolio review recommended",
-            "action": "Schedule annual portfolio rebalancing"
-        })
+    if current_month == 12 and _is_visible(_REBALANCE_REMINDER_ALERT, min_rank):
+        yield _REBALANCE_REMINDER_ALERT
     
     # Market condition-based alerts
-    if "tech" in portfolio_sectors.lower():
-        alerts.append({
-            "type": "SECTOR_WATCH",
-            "severity": "INFO",
-            "message": "Technology sector exposure detected",
-            "action": "Monitor Fed interest rate decisions that may impact tech valuations"
-        })
+    if "tech" in portfolio_sectors.lower() and _is_visible(_SECTOR_WATCH_ALERT, min_rank):
+        yield _SECTOR_WATCH_ALERT
     
     # General market alert
-    alerts.append({
-        "type": "MARKET_UPDATE",
-        "severity": "INFO",
-        "message": "Regular portfolio monitoring recommended",
-        "action": "Review portfolio performance monthly"
-    })
-    
-    return {
-        "market_conditions": market_conditions,
-        "timestamp": datetime.now().isoformat(),
-        "alerts": alerts,
-        "priority_alerts": [a for a in alerts if a.get("severity") in ["HIGH", "MEDIUM"]]
-    }
+    if _is_visible(_MARKET_UPDATE_ALERT, min_rank):
+        yield _MARKET_UPDATE_ALERT
 
 
 def compile_all_alerts(
@@ -170,40 +225,132 @@ def compile_all_alerts(
     Returns:
         Comprehensive alert report
     """
-    all_alerts = []
+    # Read the clock once and share it across every sub-check
+    now = datetime.now()
+    profile_key = user_profile.lower()
+    
+    cache_key = (
+        hashlib.blake2b(portfolio_data.encode(), digest_size=16).hexdigest(),
+        now.date().isoformat(),
+        profile_key
+    )
+    cached = _alert_cache.get(cache_key)
+    if cached and time.monotonic() < cached[0]:
+        # Alerts are the same for the whole TTL, but the report is generated now
+        return {**cached[1], "generated_at": now.isoformat()}
     
     # Check rebalancing
-    rebalance = check_rebalancing_need(portfolio_data)
-    if rebalance.get("needs_rebalancing"):
-        all_alerts.extend(rebalance.get("alerts", []))
+    rebalance = _check_rebalancing_need(portfolio_data, 0.05, now)
+    rebalance_alerts = rebalance.get("alerts", []) if rebalance.get("needs_rebalancing") else []
     
     # Check tax-loss harvesting
-    tax = detect_tax_loss_harvesting(portfolio_data)
-    for opp in tax.get("opportunities", []):
-        all_alerts.append({
+    tax = detect_tax_loss_harvesting(portfolio_data, tax_year=now.year)
+    tax_alerts = (
+        {
             "type": opp["type"],
             "severity": "MEDIUM",
             "message": opp["action"],
             "action": opp.get("wash_sale_warning", "Review with tax advisor")
-        })
+        }
+        for opp in tax.get("opportunities", [])
+    )
     
-    # Get market alerts
-    market = generate_market_alerts(portfolio_data)
-    all_alerts.extend(market.get("alerts", []))
+    # Get market alerts (beginners skip informational noise at the source)
+    min_rank = _SEVERITY_RANK["LOW" if profile_key == "beginner" else "INFO"]
+    market_alerts = _iter_market_alerts(portfolio_data, now, min_rank)
     
-    # Filter alerts based on user profile
-    if user_profile.lower() == "beginner":
-        # Simplify alerts for beginners
-        all_alerts = [a for a in all_alerts if a.get("severity") != "INFO" or "recommend" in a.get("message", "").lower()]
+    # Consume every source in one pass: bucket by severity and keep the first 10
+    total = 0
+    top, high, medium, low = [], [], [], []
+    for alert in chain(rebalance_alerts, tax_alerts, market_alerts):
+        total += 1
+        if len(top) < 10:  # Limit to 10 most relevant
+            top.append(alert)
+        severity = alert.get("severity")
+        if severity == "HIGH":
+            high.append(alert)
+        elif severity == "MEDIUM":
+            medium.append(alert)
+        elif severity in ("LOW", "INFO"):
+            low.append(alert)
     
-    return {
-        "total_alerts": len(all_alerts),
-        "high_priority": [a for a in all_alerts if a.get("severity") == "HIGH"],
-        "medium_priority": [a for a in all_alerts if a.get("severity") == "MEDIUM"],
-        "low_priority": [a for a in all_alerts if a.get("severity") in ["LOW", "INFO"]],
-        "alerts": all_alerts[:10],  # Limit to 10 most relevant
-        "generated_at": datetime.now().isoformat()
+    report = {
+        "total_alerts": total,
+        "high_priority": high,
+        "medium_priority": medium,
+        "low_priority": low,
+        "alerts": top,
+        "generated_at": now.isoformat()
     }
+    
+    # Callers annotate the returned dict, so the cache keeps its own copy
+    with _alert_cache_lock:
+        if len(_alert_cache) >= ALERT_CACHE_MAX_ENTRIES:
+            expired_before = time.monotonic()
+            for key in [k for k, (expiry, _) in _alert_cache.items() if expiry <= expired_before]:
+                del _alert_cache[key]
+            if len(_alert_cache) >= ALERT_CACHE_MAX_ENTRIES:
+                _alert_cache.clear()
+        _alert_cache[cache_key] = (time.monotonic() + ALERT_CACHE_TTL, dict(report))
+    
+    return report
+
+
+# Portfolios per batched alert prompt; keeps the shared system prompt amortized
+# without degrading per-portfolio accuracy
+ALERT_BATCH_SIZE = 8
+
+
+def build_batched_alert_prompt(portfolios: list[dict]) -> str:
+    """
+    Format several portfolios into one numbered prompt for the alert agent.
+    
+    Args:
+        portfolios: List of portfolio dicts with 'holdings' and 'user_profile'
+        
+    Returns:
+        Prompt asking for one alert report per portfolio as a JSON array
+    """
+    blocks = [
+        f"Portfolio {i}:\nUser Profile: {p.get('user_profile', 'beginner')}\n"
+        f"Holdings: {json.dumps(p.get('holdings', []), separators=(',', ':'))}"
+        for i, p in enumerate(portfolios, 1)
+    ]
+    return (
+        f"Check these {len(portfolios)} portfolios for alerts:\n\n"
+        + "\n\n".join(blocks)
+        + "\n\nUse the compile_all_alerts tool for each portfolio, then respond with ONLY a JSON array "
+        f"containing exactly {len(portfolios)} alert report objects, in the same order as the portfolios."
+    )
+
+
+def parse_batched_alert_response(response_text: str, expected_count: int) -> Optional[list[dict]]:
+    """
+    Extract the per-portfolio alert reports from a batched agent response.
+    
+    Args:
+        response_text: Raw text returned by the alert agent
+        expected_count: Number of portfolios in the batch
+        
+    Returns:
+        List of alert report dicts, or None if the response cannot be trusted
+    """
+    start = response_text.find("[")
+    end = response_text.rfind("]")
+    if start == -1 or end < start:
+        return None
+    try:
+        reports = json.loads(response_text[start:end + 1])
+    except ValueError:
+        return None
+    if not isinstance(reports, list) or len(reports) != expected_count:
+        return None
+    if not all(isinstance(r, dict) for r in reports):
+        return None
+    return reports
+
+
+_ALERT_AGENT_INSTRUCTION = load_instruction("alert")
 
 
 # Define the Alert Agent
@@ -211,25 +358,7 @@ alert_agent = LlmAgent(
     name="AlertAgent",
     model="gemini-2.5-flash",
     description="Monitors portfolio for rebalancing needs, tax opportunities, and generates relevant alerts",
-    instruction="""You are a portfolio monitoring specialist. Your job is to proactively identify important alerts and opportunities for the investor.
-
-Monitor for:
-1. **Rebalancing Needs**: Detect when portfolio drift exceeds acceptable thresholds
-2. **Tax-Loss Harvesting**: Identify positions with losses that could offset gains
-3. **Market Alerts**: Provide context-aware market updates relevant to the portfolio
-
-For each alert:
-- Assign a severity level (HIGH, MEDIUM, LOW, INFO)
-- Provide a clear, actionable message
-- Suggest specific next steps
-
-Prioritize alerts based on:
-- Immediate financial impact
-- Time sensitivity
-- User profile (beginners need simpler, fewer alerts)
-
-Use the compile_all_alerts tool to generate a comprehensive alert report.
-""",
+    instruction=_ALERT_AGENT_INSTRUCTION,
     tools=[check_rebalancing_need, detect_tax_loss_harvesting, generate_market_alerts, compile_all_alerts],
     output_key="alerts"
 )
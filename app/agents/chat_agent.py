@@ -2,13 +2,27 @@
 Portfolio Chat Agent using Google ADK.
 Provides conversational answers about portfolio analysis WITH tool calling for calculations.
 """
-import os
 import json
+from functools import lru_cache
 from google.adk.agents import LlmAgent
-from dotenv import load_dotenv
+from . import load_instruction
 
-# Load environment variables
-load_dotenv()
+# Symbol classes used to estimate the risk impact of adding a position
+INDEX_FUNDS = frozenset({"SPY", "VTI", "QQQ", "VOO", "IVV", "VT", "VEA", "BND", "AGG"})
+HIGH_VOLATILITY_STOCKS = frozenset({"TSLA", "NVDA", "AMD", "COIN", "GME", "AMC", "MARA", "RIOT"})
+LARGE_CAP_STOCKS = frozenset({"AAPL", "MSFT", "GOOGL", "GOOG", "META", "AMZN", "JNJ", "PG", "KO", "WMT"})
+
+
+# symbol -> (risk_change, stock_type, impact), built once so classification is one hash lookup
+_SYMBOL_CLASS: dict[str, tuple[float, str, str]] = {
+    # Large-cap stable stocks - neutral/slight increase
+    **dict.fromkeys(LARGE_CAP_STOCKS, (0.2, "Large-Cap Stock", "NEUTRAL")),
+    # High-volatility stocks increase risk
+    **dict.fromkeys(HIGH_VOLATILITY_STOCKS, (0.6, "High-Volatility Stock", "CAUTIONARY")),
+    # Index funds/ETFs typically reduce risk
+    **dict.fromkeys(INDEX_FUNDS, (-0.5, "Index Fund/ETF", "POSITIVE")),
+}
+_DEFAULT_SYMBOL_CLASS = (0.3, "Stock", "NEUTRAL")
 
 
 # Tool function: Get portfolio summary
@@ -39,6 +53,10 @@ def get_portfolio_info(
     }
 
 
+# Simulation tools are pure functions of their arguments, so retries and repeated
+# what-if questions are served from an LRU cache. The cache holds immutable
+# (key, value) tuples and every call builds a fresh dict from them.
+
 # Tool function: Simulate adding a stock
 def simulate_add_stock(
     stock_symbol: str,
@@ -59,36 +77,28 @@ def simulate_add_stock(
     Returns:
         Dictionary with simulation results including new value and risk
     """
+    return dict(_simulate_add_stock_items(stock_symbol, amount, current_portfolio_value, current_risk_score))
+
+
+@lru_cache(maxsize=1024)
+def _simulate_add_stock_items(
+    stock_symbol: str,
+    amount: float,
+    current_portfolio_value: float,
+    current_risk_score: float
+) -> tuple:
+    """Cached body of simulate_add_stock, as (key, value) pairs."""
     # Calculate new portfolio value
     new_value = current_portfolio_value + amount
     
     # Estimate risk change based on stock type
     symbol_upper = stock_symbol.upper()
-    
-    # Index funds/ETFs typically reduce risk
-    if symbol_upper in ["SPY", "VTI", "QQQ", "VOO", "IVV", "VT", "VEA", "BND", "AGG"]:
-        risk_change = -0.5
-        stock_type = "Index Fund/ETF"
-        impact = "POSITIVE"
-    # High-volatility stocks increase risk
-    elif symbol_upper in ["TSLA", "NVDA", "AMD", "COIN", "GME", "AMC", "MARA", "RIOT"]:
-        risk_change = 0.6
-        stock_type = "High-Volatility Stock"
-        impact = "CAUTIONARY"
-    # Large-cap stable stocks - neutral/slight increase
-    elif symbol_upper in ["AAPL", "MSFT", "GOOGL", "GOOG", "META", "AMZN", "JNJ", "PG", "KO", "WMT"]:
-        risk_change = 0.2
-        stock_type = "Large-Cap Stock"
-        impact = "NEUTRAL"
-    else:
-        risk_change = 0.3
-        stock_type = "Stock"
-        impact = "NEUTRAL"
+    risk_change, stock_type, impact = _SYMBOL_CLASS.get(symbol_upper, _DEFAULT_SYMBOL_CLASS)
     
     new_risk_score = round(min(10, max(1, current_risk_score + risk_change)), 2)
     weight_in_new_portfolio = (amount / new_value) * 100
     
-    return {
+    return tuple({
         "scenario": f"Add ${amount:,.0f} of {symbol_upper}",
         "stock_symbol": symbol_upper,
         "stock_type": stock_type,
@@ -103,7 +113,7 @@ def simulate_add_stock(
         "analysis": f"Adding ${amount:,.0f} of {symbol_upper} ({stock_type}) would increase your portfolio to ${new_value:,.2f}. "
                    f"This would make {symbol_upper} {weight_in_new_portfolio:.1f}% of your portfolio. "
                    f"Risk score would change from {current_risk_score} to {new_risk_score} ({'+' if risk_change > 0 else ''}{risk_change:.1f} points)."
-    }
+    }.items())
 
 
 # Tool function: Simulate selling a stock
@@ -125,6 +135,18 @@ def simulate_sell_stock(
     Returns:
         Dictionary with simulation results
     """
+    return dict(_simulate_sell_stock_items(stock_symbol, amount, current_portfolio_value, current_risk_score))
+
+
+@lru_cache(maxsize=1024)
+def _simulate_sell_stock_items(
+    stock_symbol: str,
+    amount: float,
+    current_portfolio_value: float,
+    current_risk_score: float
+) -> tuple:
+    """Cached body of simulate_sell_stock, as (key, value) pairs."""
+    symbol_upper = stock_symbol.upper()
     new_value = max(0, current_portfolio_value - amount)
     
     # Selling typically reduces concentration (slight risk reduction) 
@@ -132,9 +154,9 @@ def simulate_sell_stock(
     risk_change = 0.3 if current_portfolio_value > 0 else 0
     new_risk_score = round(min(10, max(1, current_risk_score + risk_change)), 2)
     
-    return {
-        "scenario": f"Sell ${amount:,.0f} of {stock_symbol.upper()}",
-        "stock_symbol": stock_symbol.upper(),
+    return tuple({
+        "scenario": f"Sell ${amount:,.0f} of {symbol_upper}",
+        "stock_symbol": symbol_upper,
         "amount_sold": amount,
         "current_portfolio_value": current_portfolio_value,
         "new_portfolio_value": new_value,
@@ -142,12 +164,12 @@ def simulate_sell_stock(
         "new_risk_score": new_risk_score,
         "risk_change": risk_change,
         "impact": "CAUTIONARY",
-        "analysis": f"Selling ${amount:,.0f} of {stock_symbol.upper()} would reduce your portfolio to ${new_value:,.2f}. "
+        "analysis": f"Selling ${amount:,.0f} of {symbol_upper} would reduce your portfolio to ${new_value:,.2f}. "
                    f"Consider the impact on diversification. Risk score would change to {new_risk_score}."
-    }
+    }.items())
 
 
-# Tool function: Compare scenarios
+# Tool function: Compare scenarios (each option comes from the cached simulation)
 def compare_investment_options(
     option1_symbol: str,
     option2_symbol: str,
@@ -170,15 +192,17 @@ def compare_investment_options(
     """
     result1 = simulate_add_stock(option1_symbol, amount, current_portfolio_value, current_risk_score)
     result2 = simulate_add_stock(option2_symbol, amount, current_portfolio_value, current_risk_score)
+    symbol1 = result1["stock_symbol"]
+    symbol2 = result2["stock_symbol"]
     
     # Determine which is better for risk
-    better_for_risk = option1_symbol if result1["new_risk_score"] < result2["new_risk_score"] else option2_symbol
+    better_for_risk = symbol1 if result1["new_risk_score"] < result2["new_risk_score"] else symbol2
     
     return {
-        "comparison": f"{option1_symbol.upper()} vs {option2_symbol.upper()} - ${amount:,.0f} investment",
+        "comparison": f"{symbol1} vs {symbol2} - ${amount:,.0f} investment",
         "option1": result1,
         "option2": result2,
-        "recommendation": f"{better_for_risk.upper()} would result in a lower risk score ({min(result1['new_risk_score'], result2['new_risk_score'])})",
+        "recommendation": f"{better_for_risk} would result in a lower risk score ({min(result1['new_risk_score'], result2['new_risk_score'])})",
         "risk_difference": abs(result1["new_risk_score"] - result2["new_risk_score"])
     }
 
@@ -190,46 +214,50 @@ def get_portfolio_summary(portfolio_data: dict) -> str:
     if not portfolio_data:
         return "No portfolio data available."
     
+    # The same context comes back on every chat turn, so the formatted
+    # summary is cached on the fields it is built from
+    key = (
+        portfolio_data.get('total_value', 0),
+        portfolio_data.get('risk_score', 'N/A'),
+        portfolio_data.get('risk_level', 'N/A'),
+        tuple((h.get('symbol', 'Unknown'), h.get('value', 0)) for h in portfolio_data.get('holdings', [])),
+    )
+    try:
+        return _format_portfolio_summary(*key)
+    except TypeError:
+        # Unhashable values in the context; format without the cache
+        return _format_portfolio_summary.__wrapped__(*key)
+
+
+@lru_cache(maxsize=256, typed=True)
+def _format_portfolio_summary(total_value, risk_score, risk_level, holdings: tuple) -> str:
+    """Build the summary text from the fields picked out by get_portfolio_summary."""
     summary_parts = []
     summary_parts.append("PORTFOLIO DATA:")
-    summary_parts.append(f"  Total Value: ${portfolio_data.get('total_value', 0):,.2f}")
-    summary_parts.append(f"  Risk Score: {portfolio_data.get('risk_score', 'N/A')}/10")
-    summary_parts.append(f"  Risk Level: {portfolio_data.get('risk_level', 'N/A')}")
+    summary_parts.append(f"  Total Value: ${total_value:,.2f}")
+    summary_parts.append(f"  Risk Score: {risk_score}/10")
+    summary_parts.append(f"  Risk Level: {risk_level}")
     
-    holdings = portfolio_data.get('holdings', [])
     if holdings:
         summary_parts.append(f"\nHOLDINGS ({len(holdings)} positions):")
-        for h in holdings:
-            symbol = h.get('symbol', 'Unknown')
-            value = h.get('value', 0)
-            summary_parts.append(f"  - {symbol}: ${value:,.2f}" if isinstance(value, (int, float)) else f"  - {symbol}")
+        summary_parts.extend(
+            f"  - {symbol}: ${value:,.2f}" if isinstance(value, (int, float))
+            else f"  - {symbol}"
+            for symbol, value in holdings
+        )
     
     return "\n".join(summary_parts)
 
 
+_CHAT_AGENT_INSTRUCTION = load_instruction("chat")
+
+
 # Define the Portfolio Chat Agent with tools
 portfolio_chat_agent = LlmAgent(
     name="PortfolioChatAgent",
     model="gemini-2.5-flash",
     description="Conversational investment advisor that answers questions about portfolios and can run calculations",
-    instruction="""You are an expert investment advisor assistant. You can help users understand their portfolio and run calculations using your tools.
-
-AVAILABLE TOOLS:
-- simulate_add_stock: Calculate what happens if user buys a stock
-- simulate_sell_stock: Calculate what happens if user sells a stock  
-- compare_investment_options: Compare two investment choices
-- get_portfolio_info: Get portfolio summary
-
-WHEN TO USE TOOLS:
-- User asks "what if I buy/add X of Y" -> Use simulate_add_stock
-- User asks about selling -> Use simulate_sell_stock
-- User asks to compare options -> Use compare_investment_options
-- User asks about their portfolio -> Use get_portfolio_info
-
-ALWAYS use the tools when the user asks about scenarios. The tools do REAL calculations.
-After getting tool results, explain them conversationally to the user.
-Reference specific numbers from the tool results in your response.
-""",
+    instruction=_CHAT_AGENT_INSTRUCTION,
     tools=[simulate_add_stock, simulate_sell_stock, compare_investment_options, get_portfolio_info],
     output_key="chat_response"
 )
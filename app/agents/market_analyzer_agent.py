@@ -6,20 +6,60 @@ ADK Limitation: Built-in tools like google_search cannot be mixed with custom fu
 in the same agent. Solution: Use AgentTool to delegate to specialized sub-agents.
 """
 import os
-import requests
+import re
+import math
+import time
+import atexit
+import bisect
+import asyncio
+import threading
+import aiohttp
+import orjson
 from datetime import datetime
-from google.adk.agents import Agent
-from google.adk.tools import google_search
-from google.adk.tools.agent_tool import AgentTool
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
+from typing import Optional
+from . import load_instruction
 
 # Alpha Vantage API
 ALPHA_VANTAGE_API_KEY = os.getenv("ALPHA_VANTAGE_API_KEY", "")
 ALPHA_VANTAGE_BASE_URL = "https://www.alphavantage.co/query"
 
+# Live quote cache: symbol -> (expiry from time.monotonic(), result dict)
+STOCK_PRICE_TTL = float(os.getenv("STOCK_PRICE_TTL", "60"))
+_quote_cache: dict[str, tuple[float, dict]] = {}
+_quote_cache_lock = threading.Lock()
+
+# Alpha Vantage I/O runs on one background event loop shared by all tool calls,
+# so concurrent lookups cost sockets rather than blocked worker threads
+_io_loop = asyncio.new_event_loop()
+threading.Thread(target=_io_loop.run_forever, name="alpha-vantage-io", daemon=True).start()
+_http_session: Optional[aiohttp.ClientSession] = None
+
+# Timeouts and retry policy for Alpha Vantage requests
+ALPHA_VANTAGE_TIMEOUT = aiohttp.ClientTimeout(total=10, connect=2, sock_read=8)
+ALPHA_VANTAGE_MAX_RETRIES = 2
+_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# At most this many Alpha Vantage requests are in flight at once across all callers
+ALPHA_VANTAGE_MAX_CONCURRENCY = 5
+_request_slots = asyncio.Semaphore(ALPHA_VANTAGE_MAX_CONCURRENCY)
+
+# Circuit breaker: after this many consecutive failed lookups, skip HTTP for the cooldown
+# and let callers fall back to mock data straight away. Only touched on _io_loop.
+ALPHA_VANTAGE_BREAKER_THRESHOLD = 3
+ALPHA_VANTAGE_BREAKER_COOLDOWN = 60.0
+_breaker = {"fails": 0, "opened_at": 0.0}
+
+# Momentum bands: pct above each threshold moves up one label
+_MOMENTUM_THRESHOLDS = (-2, -0.5, 0.5, 2)
+_MOMENTUM_LABELS = (
+    ("STRONG BEARISH", "negative"),
+    ("BEARISH", "mildly negative"),
+    ("NEUTRAL", "sideways"),
+    ("BULLISH", "mildly positive"),
+    ("STRONG BULLISH", "positive"),
+)
+_PCT_STRIP_RE = re.compile(r"[+%\s]")
+
 # Mock prices fallback - ONLY used when Alpha Vantage is unavailable
 MOCK_PRICES = {
     "AAPL": {"price": 195.50, "change": 2.30, "change_percent": "1.19%", "volume": 45000000},
@@ -33,54 +73,163 @@ MOCK_PRICES = {
 }
 
 
-def get_live_stock_price(symbol: str) -> dict:
+async def _get_http_session() -> aiohttp.ClientSession:
+    """Create the shared aiohttp session on first use (always on _io_loop)."""
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        _http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=20, ttl_dns_cache=300),
+            timeout=ALPHA_VANTAGE_TIMEOUT
+        )
+    return _http_session
+
+
+def _breaker_open() -> bool:
+    """True while the Alpha Vantage circuit breaker is tripped."""
+    return (
+        _breaker["fails"] >= ALPHA_VANTAGE_BREAKER_THRESHOLD
+        and time.monotonic() - _breaker["opened_at"] < ALPHA_VANTAGE_BREAKER_COOLDOWN
+    )
+
+
+def _record_outcome(ok: bool) -> None:
+    """Reset the breaker on success; count a failure and (re)start the cooldown otherwise."""
+    if ok:
+        _breaker["fails"] = 0
+    else:
+        _breaker["fails"] += 1
+        _breaker["opened_at"] = time.monotonic()
+
+
+def _retry_delay(response: aiohttp.ClientResponse, attempt: int) -> float:
+    """Seconds to wait before the next attempt: Retry-After when given (capped), else exponential."""
+    try:
+        return min(float(response.headers.get("Retry-After", "")), 5.0)
+    except ValueError:
+        return 0.2 * 2 ** attempt
+
+
+async def _fetch_quote(symbol: str) -> dict:
+    """Fetch raw GLOBAL_QUOTE JSON, retrying rate limits and server errors with backoff."""
+    if _breaker_open():
+        raise RuntimeError("Alpha Vantage circuit breaker open, skipping request")
+    session = await _get_http_session()
+    params = {
+        "function": "GLOBAL_QUOTE",
+        "symbol": symbol,
+        "apikey": ALPHA_VANTAGE_API_KEY
+    }
+    try:
+        for attempt in range(ALPHA_VANTAGE_MAX_RETRIES + 1):
+            async with _request_slots:
+                async with session.get(ALPHA_VANTAGE_BASE_URL, params=params) as response:
+                    retry = response.status in _RETRY_STATUSES and attempt < ALPHA_VANTAGE_MAX_RETRIES
+                    if not retry:
+                        data = orjson.loads(await response.read())
+                        # Rate limiting arrives either as a status code or as a 200 with a
+                        # "Note" (per-minute) or "Information" (daily quota) message
+                        _record_outcome(
+                            response.status not in _RETRY_STATUSES
+                            and "Note" not in data
+                            and "Information" not in data
+                        )
+                        return data
+                    delay = _retry_delay(response, attempt)
+            # Back off without holding a slot
+            await asyncio.sleep(delay)
+    except Exception:
+        _record_outcome(False)
+        raise
+
+
+async def _fetch_quotes(symbols: list[str]) -> list:
+    """Fetch several quotes concurrently; failures are returned as exceptions."""
+    return await asyncio.gather(*(_fetch_quote(s) for s in symbols), return_exceptions=True)
+
+
+def fetch_global_quotes(symbols: list[str]) -> list:
     """
-    Fetch live stock price from Alpha Vantage API.
-    Falls back to mock data ONLY if API is unavailable.
+    Fetch raw GLOBAL_QUOTE JSON for several symbols concurrently on the shared session.
     
     Args:
-        symbol: Stock ticker symbol (e.g., AAPL, GOOGL, MSFT)
+        symbols: Normalized ticker symbols
         
     Returns:
-        Dictionary with current price, change, percent change, volume, and data source
+        List aligned with symbols holding each parsed response, or the exception it raised
     """
-    symbol = symbol.upper().strip()
-    
-    # Try Alpha Vantage first
-    if ALPHA_VANTAGE_API_KEY:
+    return _run_io(_fetch_quotes(symbols), requests=len(symbols))
+
+
+@atexit.register
+def _close_http_session() -> None:
+    """Close the shared aiohttp session before the interpreter exits."""
+    if _http_session is not None and not _http_session.closed:
         try:
-            params = {
-                "function": "GLOBAL_QUOTE",
+            _run_io(_http_session.close())
+        except Exception:
+            pass
+
+
+def _run_io(coro, requests: int = 1):
+    """
+    Run a coroutine on the background I/O loop and wait for its result.
+    
+    The wait allows one request timeout (plus slack) per wave of
+    ALPHA_VANTAGE_MAX_CONCURRENCY requests. On timeout the coroutine is
+    cancelled so it stops holding request slots.
+    
+    Args:
+        coro: Coroutine to run
+        requests: Number of Alpha Vantage requests the coroutine issues
+    """
+    waves = max(1, math.ceil(requests / ALPHA_VANTAGE_MAX_CONCURRENCY))
+    timeout = (ALPHA_VANTAGE_TIMEOUT.total + 5) * waves
+    future = asyncio.run_coroutine_threadsafe(coro, _io_loop)
+    try:
+        return future.result(timeout=timeout)
+    except TimeoutError:
+        future.cancel()
+        raise TimeoutError(f"Alpha Vantage requests timed out after {timeout:.0f}s") from None
+
+
+def _cached_quote(symbol: str) -> Optional[dict]:
+    """Return a fresh copy of a cached live quote, or None on miss/expiry."""
+    cached = _quote_cache.get(symbol)
+    if cached and time.monotonic() < cached[0]:
+        return {**cached[1], "timestamp": datetime.now().isoformat()}
+    return None
+
+
+def _quote_result(symbol: str, data: Optional[dict]) -> dict:
+    """Build the tool result from Alpha Vantage JSON, falling back to mock data."""
+    if data:
+        if "Global Quote" in data and data["Global Quote"]:
+            quote = data["Global Quote"]
+            price = float(quote.get("05. price", 0))
+            change = float(quote.get("09. change", 0))
+            change_pct = quote.get("10. change percent", "0%")
+            volume = int(quote.get("06. volume", 0))
+            
+            result = {
                 "symbol": symbol,
-                "apikey": ALPHA_VANTAGE_API_KEY
+                "price": price,
+                "change": change,
+                "change_percent": change_pct,
+                "volume": volume,
+                "data_source": "LIVE - Alpha Vantage",
+                "timestamp": datetime.now().isoformat(),
+                "status": "success"
             }
-            response = requests.get(ALPHA_VANTAGE_BASE_URL, params=params, timeout=10)
-            data = response.json()
             
-            if "Global Quote" in data and data["Global Quote"]:
-                quote = data["Global Quote"]
-                price = float(quote.get("05. price", 0))
-                change = float(quote.get("09. change", 0))
-                change_pct = quote.get("10. change percent", "0%")
-                volume = int(quote.get("06. volume", 0))
-                
-                return {
-                    "symbol": symbol,
-                    "price": price,
-                    "change": change,
-                    "change_percent": change_pct,
-                    "volume": volume,
-                    "data_source": "LIVE - Alpha Vantage",
-                    "timestamp": datetime.now().isoformat(),
-                    "status": "success"
-                }
-            else:
-                # API returned but no data (rate limit or invalid symbol)
-                error_msg = data.get("Note", data.get("Information", "Unknown error"))
-                print(f"⚠️ Alpha Vantage: {error_msg}")
-                
-        except Exception as e:
-            print(f"⚠️ Alpha Vantage API error: {e}")
+            # Cache only live quotes so fallbacks are retried on the next call
+            with _quote_cache_lock:
+                _quote_cache[symbol] = (time.monotonic() + STOCK_PRICE_TTL, result)
+            
+            return result
+        else:
+            # API returned but no data (rate limit or invalid symbol)
+            error_msg = data.get("Note", data.get("Information", "Unknown error"))
+            print(f"⚠️ Alpha Vantage: {error_msg}")
     
     # Fallback to mock data ONLY if API unavailable
     if symbol in MOCK_PRICES:
@@ -109,6 +258,73 @@ def get_live_stock_price(symbol: str) -> dict:
     }
 
 
+def get_live_stock_price(symbol: str) -> dict:
+    """
+    Fetch live stock price from Alpha Vantage API.
+    Falls back to mock data ONLY if API is unavailable.
+    
+    Args:
+        symbol: Stock ticker symbol (e.g., AAPL, GOOGL, MSFT)
+        
+    Returns:
+        Dictionary with current price, change, percent change, volume, and data source
+    """
+    symbol = symbol.upper().strip()
+    
+    # Serve repeat lookups from the TTL cache
+    cached = _cached_quote(symbol)
+    if cached:
+        return cached
+    
+    # Try Alpha Vantage first
+    data = None
+    if ALPHA_VANTAGE_API_KEY:
+        try:
+            data = _run_io(_fetch_quote(symbol))
+        except Exception as e:
+            print(f"⚠️ Alpha Vantage API error: {e}")
+    
+    return _quote_result(symbol, data)
+
+
+def get_live_stock_prices(symbols: list[str]) -> dict:
+    """
+    Fetch live stock prices for several symbols at once.
+    Requests are issued concurrently, so N symbols cost roughly one round-trip.
+    
+    Args:
+        symbols: List of stock ticker symbols (e.g., ["AAPL", "MSFT", "NVDA"])
+        
+    Returns:
+        Dictionary mapping each symbol to its get_live_stock_price result
+    """
+    unique_symbols = list(dict.fromkeys(s.upper().strip() for s in symbols if s and s.strip()))
+    
+    results = {}
+    pending = []
+    for symbol in unique_symbols:
+        cached = _cached_quote(symbol)
+        if cached:
+            results[symbol] = cached
+        else:
+            pending.append(symbol)
+    
+    fetched = [None] * len(pending)
+    if pending and ALPHA_VANTAGE_API_KEY:
+        try:
+            fetched = _run_io(_fetch_quotes(pending), requests=len(pending))
+        except Exception as e:
+            print(f"⚠️ Alpha Vantage API error: {e}")
+    
+    for symbol, data in zip(pending, fetched):
+        if isinstance(data, BaseException):
+            print(f"⚠️ Alpha Vantage API error for {symbol}: {data}")
+            data = None
+        results[symbol] = _quote_result(symbol, data)
+    
+    return {symbol: results[symbol] for symbol in unique_symbols}
+
+
 def analyze_stock_trend(symbol: str, current_price: float, price_change: float, price_change_percent: str) -> dict:
     """
     Analyze stock trend based on current data and provide directional outlook.
@@ -126,26 +342,12 @@ def analyze_stock_trend(symbol: str, current_price: float, price_change: float,
     
     # Parse percent change
     try:
-        pct = float(price_change_percent.replace("%", "").replace("+", ""))
-    except:
+        pct = float(_PCT_STRIP_RE.sub("", price_change_percent))
+    except (TypeError, ValueError):
         pct = 0
     
-    # Determine momentum
-    if pct > 2:
-        momentum = "STRONG BULLISH"
-        outlook = "positive"
-    elif pct > 0.5:
-        momentum = "BULLISH"
-        outlook = "mildly positive"
-    elif pct > -0.5:
-        momentum = "NEUTRAL"
-        outlook = "sideways"
-    elif pct > -2:
-        momentum = "BEARISH" 
-        outlook = "mildly negative"
-    else:
-        momentum = "STRONG BEARISH"
-        outlook = "negative"
+    # Determine momentum (bisect_left keeps the strict ">" band edges)
+    momentum, outlook = _MOMENTUM_LABELS[bisect.bisect_left(_MOMENTUM_THRESHOLDS, pct)]
     
     return {
         "symbol": symbol,
@@ -164,88 +366,54 @@ def analyze_stock_trend(symbol: str, current_price: float, price_change: float,
 # MULTI-AGENT ARCHITECTURE
 # ============================================================================
 
-# Agent 1: Search Agent - ONLY has google_search (built-in tool)
-# This agent searches the web for market news, analyst opinions, forecasts
-search_agent = Agent(
-    name="MarketSearchAgent",
-    model="gemini-2.0-flash",  # Required for google_search
-    description="Searches the web for latest market news, analyst opinions, and stock forecasts",
-    instruction="""You are a market research specialist. When asked about stocks or market trends:
-1. Search for the latest news, analyst ratings, and market sentiment
-2. Look for recent earnings reports, price targets, and institutional activity
-3. Find any relevant macroeconomic factors affecting the stock/market
-4. Always cite your sources with URLs when possible
-5. Focus on recent information (last few days/weeks)
-
-Provide a comprehensive summary of what you find.""",
-    tools=[google_search]  # ONLY google_search - no other tools allowed
-)
-
-# Agent 2: Stock Data Agent - Has custom tools for price data
-stock_data_agent = Agent(
-    name="StockDataAgent", 
-    model="gemini-2.5-flash",
-    description="Gets live stock prices and analyzes technical trends",
-    instruction="""You are a stock data analyst. When asked about a stock:
-1. Get the current live price using get_live_stock_price
-2. Analyze the trend using analyze_stock_trend
-3. Report whether data is LIVE or DEMO/fallback
-4. Provide clear price information and momentum analysis""",
-    tools=[get_live_stock_price, analyze_stock_trend]
-)
-
-# Root Agent: Orchestrates the sub-agents using AgentTool
-market_analyzer_agent = Agent(
-    name="MarketAnalyzer",
-    model="gemini-2.5-flash",
-    description="Expert market analyst that combines web search with live stock data for predictions",
-    instruction="""You are a friendly market analyst who explains things simply for beginner investors.
-
-YOU HAVE ACCESS TO TWO SPECIALIST AGENTS:
-1. MarketSearchAgent - Searches the web for latest news and analyst opinions  
-2. StockDataAgent - Gets live stock prices and trends
-
-WHEN USER ASKS ABOUT STOCK PREDICTIONS:
-1. FIRST: Ask MarketSearchAgent for latest news
-2. THEN: Ask StockDataAgent for current price data
-3. FINALLY: Give a SIMPLE, CLEAR prediction WITH action recommendation
+# Agents are built on first access; their instructions come from prompts/
+_LAZY_AGENT_NAMES = ("search_agent", "stock_data_agent", "market_analyzer_agent")
 
-RESPONSE FORMAT (keep it simple and short):
 
-📊 **[SYMBOL] Analysis**
-
-**Price Right Now:** $X.XX (up/down X% today)
-
-**What's Happening:**
-• [One sentence summary of market sentiment]
-• [One sentence about analyst opinion if available]
-
-**📰 Recent News:**
-• [1-2 lines of SPECIFIC current news about the company - product launches, earnings, partnerships, lawsuits, CEO statements, etc.]
-
-**My Take:** 
-[Use ONE of these simple verdicts with emoji]
-- 🟢 **Likely to GO UP** - [one simple reason]
-- 🔴 **Likely to GO DOWN** - [one simple reason]  
-- 🟡 **UNCERTAIN/SIDEWAYS** - [one simple reason]
-
-**💡 What I'd Suggest:**
-[Give ONE of these clear action recommendations]
-- ✅ **BUY NOW** - Good time to buy because [reason]
-- ⏳ **WAIT** - Better to wait because [reason], consider buying if [condition]
-- 🚫 **AVOID/SELL** - Not a good time because [reason]
-
-**What to Watch:** [1-2 key things in simple words]
+def _build_agents() -> dict:
+    """Define the market agents; ADK is only imported when one of them is first used."""
+    from google.adk.agents import Agent
+    from google.adk.tools import google_search
+    from google.adk.tools.agent_tool import AgentTool
+    
+    # Agent 1: Search Agent - ONLY has google_search (built-in tool)
+    # This agent searches the web for market news, analyst opinions, forecasts
+    search_agent = Agent(
+        name="MarketSearchAgent",
+        model="gemini-2.0-flash",  # Required for google_search
+        description="Searches the web for latest market news, analyst opinions, and stock forecasts",
+        instruction=load_instruction("market_search"),
+        tools=[google_search]  # ONLY google_search - no other tools allowed
+    )
+    
+    # Agent 2: Stock Data Agent - Has custom tools for price data
+    stock_data_agent = Agent(
+        name="StockDataAgent", 
+        model="gemini-2.5-flash",
+        description="Gets live stock prices and analyzes technical trends",
+        instruction=load_instruction("stock_data"),
+        tools=[get_live_stock_price, get_live_stock_prices, analyze_stock_trend]
+    )
+    
+    # Root Agent: Orchestrates the sub-agents using AgentTool
+    market_analyzer_agent = Agent(
+        name="MarketAnalyzer",
+        model="gemini-2.5-flash",
+        description="Expert market analyst that combines web search with live stock data for predictions",
+        instruction=load_instruction("market_analyzer"),
+        tools=[AgentTool(agent=search_agent), AgentTool(agent=stock_data_agent)]
+    )
+    
+    return {
+        "search_agent": search_agent,
+        "stock_data_agent": stock_data_agent,
+        "market_analyzer_agent": market_analyzer_agent,
+    }
 
-⚠️ *This is my opinion based on data - always verify and decide based on your own research!*
 
-CRITICAL RULES:
-- ALWAYS include Recent News with SPECIFIC headlines/events from your web search
-- ALWAYS give a clear action recommendation (BUY/WAIT/AVOID) - never say "I cannot give advice"
-- Use SIMPLE language a beginner can understand
-- Keep it SHORT - max 15 lines
-- Use emojis to make it scannable
-- Be confident in your opinion but remind them to verify
-- If uncertain, recommend WAIT with conditions for when to buy""",
-    tools=[AgentTool(agent=search_agent), AgentTool(agent=stock_data_agent)]
-)
+def __getattr__(name):
+    # Built together on first access (PEP 562) so importing the quote helpers stays light
+    if name in _LAZY_AGENT_NAMES:
+        globals().update(_build_agents())
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,71 @@
+"""
+Portfolio Agent using Google ADK.
+Combines risk analysis, recommendations and scenario modeling in a single agent,
+so one Gemini request covers all three instead of three sequential round-trips.
+"""
+import json
+from typing import Optional
+from google.adk.agents import LlmAgent
+
+from . import load_instruction
+from .risk_analyzer_agent import analyze_risk
+from .recommendation_agent import generate_recommendations
+from .scenario_agent import simulate_scenario, run_multiple_scenarios
+
+# Sections the combined report is split into, one per original agent
+PORTFOLIO_REPORT_SECTIONS = ("risk_analysis", "recommendations", "scenarios")
+
+# The narrative-only report also explains the alerts
+PORTFOLIO_NARRATIVE_SECTIONS = PORTFOLIO_REPORT_SECTIONS + ("alerts",)
+
+
+def parse_portfolio_report(response_text: str, sections: tuple = PORTFOLIO_REPORT_SECTIONS) -> Optional[dict]:
+    """
+    Split the combined agent response into its per-section texts.
+
+    Args:
+        response_text: Raw text returned by the portfolio agent
+        sections: Keys the report must contain
+    
+    Returns:
+        Dictionary mapping each section key to its text, or None if the
+        response is not the expected JSON object
+    """
+    start = response_text.find("{")
+    end = response_text.rfind("}")
+    if start == -1 or end < start:
+        return None
+    try:
+        report = json.loads(response_text[start:end + 1])
+    except ValueError:
+        return None
+    if not isinstance(report, dict) or not all(key in report for key in sections):
+        return None
+    return {
+        key: value if isinstance(value, str) else json.dumps(value)
+        for key, value in ((k, report[k]) for k in sections)
+    }
+
+
+_PORTFOLIO_AGENT_INSTRUCTION = load_instruction("portfolio")
+
+
+# Define the combined Portfolio Agent
+portfolio_agent = LlmAgent(
+    name="PortfolioAgent",
+    model="gemini-2.5-flash",
+    description="Analyzes portfolio risk, generates recommendations and models what-if scenarios in a single request",
+    instruction=_PORTFOLIO_AGENT_INSTRUCTION,
+    tools=[analyze_risk, generate_recommendations, simulate_scenario, run_multiple_scenarios],
+    output_key="portfolio_report"
+)
+
+
+# Narrative-only agent: explains tool results computed beforehand, so it needs no tools
+portfolio_narrative_agent = LlmAgent(
+    name="PortfolioNarrativeAgent",
+    model="gemini-2.5-flash",
+    description="Explains precomputed risk, recommendation, scenario and alert results in plain language",
+    instruction=load_instruction("portfolio_narrative"),
+    output_key="portfolio_narrative"
+)
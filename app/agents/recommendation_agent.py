@@ -2,12 +2,122 @@
 Recommendation Agent using Google ADK.
 Profiles user and generates actionable Buy/Hold/Sell recommendations.
 """
-import os
+from dataclasses import dataclass, asdict
+from functools import lru_cache
 from google.adk.agents import LlmAgent
-from dotenv import load_dotenv
+from . import load_instruction
 
-# Load environment variables
-load_dotenv()
+
+@dataclass(slots=True, frozen=True)
+class Recommendation:
+    """A single recommendation entry; serialized to a dict once per cached bucket."""
+    action: str
+    stock: str
+    reason: str
+    confidence: float
+    priority: str
+
+
+# Static recommendation sets, keyed by (is_beginner, is_high_risk) in _base_recommendations,
+# which caches their dict form; those dicts are shared by every response, so treat them as read-only.
+BEGINNER_HIGH_RISK_RECOMMENDATIONS = (
+    Recommendation(
+        action="BUY",
+        stock="SPY",
+        reason="Add index fund exposure to reduce overall portfolio risk through diversification",
+        confidence=0.92,
+        priority="HIGH"
+    ),
+    Recommendation(
+        action="HOLD",
+        stock="Current Holdings",
+        reason="Avoid panic selling; focus on gradual rebalancing instead",
+        confidence=0.85,
+        priority="MEDIUM"
+    ),
+)
+
+BEGINNER_LOW_RISK_RECOMMENDATIONS = (
+    Recommendation(
+        action="HOLD",
+        stock="Current Holdings",
+        reason="Your portfolio is well-balanced. Continue your current investment strategy.",
+        confidence=0.90,
+        priority="MEDIUM"
+    ),
+    Recommendation(
+        action="BUY",
+        stock="VTI",
+        reason="Consider adding total market ETF for long-term growth",
+        confidence=0.78,
+        priority="LOW"
+    ),
+)
+
+EXPERIENCED_HIGH_RISK_RECOMMENDATIONS = (
+    Recommendation(
+        action="SELL",
+        stock="Largest Holding",
+        reason="Consider reducing position size to decrease concentration risk",
+        confidence=0.88,
+        priority="HIGH"
+    ),
+    Recommendation(
+        action="BUY",
+        stock="Sector ETF",
+        reason="Replace individual stock exposure with sector ETF to maintain exposure while reducing single-stock risk",
+        confidence=0.82,
+        priority="MEDIUM"
+    ),
+)
+
+EXPERIENCED_LOW_RISK_RECOMMENDATIONS = (
+    Recommendation(
+        action="HOLD",
+        stock="Current Holdings",
+        reason="Portfolio risk is within acceptable bounds. Review quarterly.",
+        confidence=0.88,
+        priority="MEDIUM"
+    ),
+)
+
+# General recommendation appended for every profile
+REVIEW_RECOMMENDATION = Recommendation(
+    action="REVIEW",
+    stock="Portfolio",
+    reason="Schedule quarterly portfolio review to assess performance and rebalance if needed",
+    confidence=0.95,
+    priority="MEDIUM"
+)
+
+_RECOMMENDATION_SETS = {
+    (True, True): BEGINNER_HIGH_RISK_RECOMMENDATIONS,
+    (True, False): BEGINNER_LOW_RISK_RECOMMENDATIONS,
+    (False, True): EXPERIENCED_HIGH_RISK_RECOMMENDATIONS,
+    (False, False): EXPERIENCED_LOW_RISK_RECOMMENDATIONS,
+}
+
+# Profile advice as (risk threshold, advice above threshold, advice otherwise)
+_PROFILE_ADVICE = {
+    "beginner": (
+        6,
+        "As a beginner, your current portfolio may be too risky. Consider shifting 20-30% to index funds.",
+        "Great job maintaining a balanced portfolio! Keep learning about different asset classes."
+    ),
+    "senior": (
+        7,
+        "While you may have appetite for risk, ensure you have adequate stop-losses in place.",
+        "Your portfolio management is solid. Consider tax-loss harvesting opportunities."
+    ),
+}
+_DEFAULT_PROFILE_ADVICE = "Review your portfolio quarterly and consider your long-term financial goals."
+
+
+@lru_cache(maxsize=32)
+def _base_recommendations(is_beginner: bool, is_high_risk: bool) -> tuple:
+    """Static recommendations for a profile/risk bucket as dicts, with the REVIEW entry appended."""
+    records = (*_RECOMMENDATION_SETS[(is_beginner, is_high_risk)], REVIEW_RECOMMENDATION)[:5]  # Limit to 5 recommendations
+    return tuple(asdict(record) for record in records)
 
 
 def generate_recommendations(
@@ -28,98 +138,32 @@ def generate_recommendations(
     Returns:
         Dictionary with personalized recommendations
     """
-    recommendations = []
-    
-    # Parse risk level
+    # Only the risk threshold matters, so the recommendations come from a small cached table
+    profile_key = user_profile.lower()
     is_high_risk = risk_score > 6
-    is_beginner = user_profile.lower() == "beginner"
-    
-    # Generate base recommendations based on profile and risk
-    if is_beginner:
-        if is_high_risk:
-            recommendations.append({
-                "action": "BUY",
-                "stock": "SPY",
-                "reason": "Add index fund exposure to reduce overall portfolio risk through diversification",
-                "confidence": 0.92,
-                "priority": "HIGH"
-            })
-            recommendations.append({
-                "action": "HOLD",
-                "stock": "Current Holdings",
-                "reason": "Avoid panic selling; focus on gradual rebalancing instead",
-                "confidence": 0.85,
-                "priority": "MEDIUM"
-            })
-        else:
-            recommendations.append({
-                "action": "HOLD",
-                "stock": "Current Holdings",
-                "reason": "Your portfolio is well-balanced. Continue your current investment strategy.",
-                "confidence": 0.90,
-                "priority": "MEDIUM"
-            })
-            recommendations.append({
-                "action": "BUY",
-                "stock": "VTI",
-                "reason": "Consider adding total market ETF for long-term growth",
-                "confidence": 0.78,
-                "priority": "LOW"
-            })
-    else:  # Intermediate or Senior
-        if is_high_risk:
-            recommendations.append({
-                "action": "SELL",
-                "stock": "Largest Holding",
-                "reason": "Consider reducing position size to decrease concentration risk",
-                "confidence": 0.88,
-                "priority": "HIGH"
-            })
-            recommendations.append({
-                "action": "BUY",
-                "stock": "Sector ETF",
-                "reason": "Replace individual stock exposure with sector ETF to maintain exposure while reducing single-stock risk",
-                "confidence": 0.82,
-                "priority": "MEDIUM"
-            })
-        else:
-            recommendations.append({
-                "action": "HOLD",
-                "stock": "Current Holdings",
-                "reason": "Portfolio risk is within acceptable bounds. Review quarterly.",
-                "confidence": 0.88,
-                "priority": "MEDIUM"
-            })
-    
-    # Add general recommendation
-    recommendations.append({
-        "action": "REVIEW",
-        "stock": "Portfolio",
-        "reason": "Schedule quarterly portfolio review to assess performance and rebalance if needed",
-        "confidence": 0.95,
-        "priority": "MEDIUM"
-    })
+    is_beginner = profile_key == "beginner"
     
     return {
         "user_profile": user_profile,
         "profile_description": "Beginner investor - focus on safety and education" if is_beginner else "Experienced investor - can tolerate higher risk",
-        "recommendations": recommendations[:5],  # Limit to 5 recommendations
-        "general_advice": get_advice_for_profile(user_profile, risk_score)
+        # Entries are shared module-level dicts; only the list is allocated per call
+        "recommendations": list(_base_recommendations(is_beginner, is_high_risk)),
+        "general_advice": _advice_for_profile_key(profile_key, risk_score)
     }
 
 
 def get_advice_for_profile(profile: str, risk_score: float) -> str:
     """Get general advice based on user profile and risk level."""
-    if profile.lower() == "beginner":
-        if risk_score > 6:
-            return "As a beginner, your current portfolio may be too risky. Consider shifting 20-30% to index funds."
-        return "Great job maintaining a balanced portfolio! Keep learning about different asset classes."
-    elif profile.lower() == "senior":
-        if risk_score > 7:
-            return "While you may have appetite for risk, ensure you have adequate stop-losses in place."
-        return "Your portfolio management is solid. Consider tax-loss harvesting opportunities."
-    else:
-        return "Review your portfolio quarterly and consider your long-term financial goals."
+    return _advice_for_profile_key(profile.lower(), risk_score)
+
+
+def _advice_for_profile_key(profile_key: str, risk_score: float) -> str:
+    """Advice lookup for an already lowercased profile."""
+    advice = _PROFILE_ADVICE.get(profile_key)
+    if advice is None:
+        return _DEFAULT_PROFILE_ADVICE
+    threshold, high_risk_advice, advice_text = advice
+    return high_risk_advice if risk_score > threshold else advice_text
 
 
 # Define the Recommendation Agent
@@ -127,26 +171,7 @@ recommendation_agent = LlmAgent(
     name="RecommendationAgent",
     model="gemini-2.5-flash",
     description="Generates personalized investment recommendations based on user profile and portfolio analysis",
-    instruction="""You are a personalized investment advisor. Your role is to analyze the portfolio and provide actionable recommendations tailored to the investor's experience level.
-
-For each portfolio:
-1. Consider the user profile (beginner, intermediate, senior investor)
-2. Evaluate the current risk level and concentration
-3. Generate 3-5 specific, actionable recommendations
-4. Each recommendation should include: action (BUY/HOLD/SELL), specific stock/ETF, reason, and confidence level
-
-Be especially careful with beginners:
-- Avoid recommending complex strategies
-- Focus on diversification and safety
-- Educate while advising
-
-For senior investors:
-- Can suggest more sophisticated strategies
-- Consider tax implications
-- Focus on optimization rather than basics
-
-Use the generate_recommendations tool to create personalized advice.
-""",
+    instruction=load_instruction("recommendation"),
     tools=[generate_recommendations],
     output_key="recommendations"
 )
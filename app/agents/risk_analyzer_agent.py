@@ -2,12 +2,56 @@
 Risk Analyzer Agent using Google ADK.
 Calculates portfolio volatility, concentration risk, and correlation.
 """
-import os
-from google.adk.agents import LlmAgent
-from dotenv import load_dotenv
+from bisect import bisect_left
+
+import numpy as np
+from . import load_instruction
+
+# Overall risk levels: scores up to each bound (inclusive) get the matching level, above 7 is HIGH
+RISK_LEVELS = ("LOW", "MODERATE", "ELEVATED", "HIGH")
+_RISK_LEVEL_BOUNDS = (3, 5, 7)
+_RISK_INTERPRETATIONS = (
+    "Your portfolio has low risk. It is well-diversified with stable assets.",
+    "Your portfolio has moderate risk. Consider monitoring for concentration issues.",
+    "Your portfolio has elevated risk. You may want to consider rebalancing.",
+    "Your portfolio has high risk. Immediate attention may be needed.",
+)
+
+# Factor assessments: bisect_left over the upper bounds of "low" and "moderate"
+_ASSESSMENT_LABELS = ("low", "moderate", "high")
+_VOLATILITY_THRESHOLDS = (0.15, 0.3)
+_CONCENTRATION_THRESHOLDS = (0.2, 0.4)
+_CORRELATION_THRESHOLDS = (0.4, 0.7)
+
+# Description templates, bound once at import
+_VOLATILITY_DESCRIPTION = "Portfolio volatility is {assessment} at {value:.1f}% annualized".format
+_CONCENTRATION_DESCRIPTION = "Portfolio concentration is {assessment} (HHI: {value:.3f})".format
+_CORRELATION_DESCRIPTION = "Asset correlation is {assessment} at {value:.2f}".format
+
+
+def risk_level_index(risk_score: float) -> int:
+    """Index of the risk level for a 1-10 score into RISK_LEVELS."""
+    # NaN fails every bound check, so it rates HIGH
+    if risk_score != risk_score:
+        return len(_RISK_LEVEL_BOUNDS)
+    return bisect_left(_RISK_LEVEL_BOUNDS, risk_score)
+
+
+def risk_level_indices(risk_scores) -> list:
+    """risk_level_index for a sequence of scores in one searchsorted call."""
+    # side="left" matches bisect_left, and NaN sorts past every bound just like the scalar path
+    return np.searchsorted(_RISK_LEVEL_BOUNDS, np.asarray(risk_scores, dtype=float), side="left").tolist()
+
+
+def _factor(value: float, thresholds: tuple, describe, display_value: float) -> dict:
+    """Build the value/assessment/description entry for one risk factor."""
+    assessment = _ASSESSMENT_LABELS[bisect_left(thresholds, value)]
+    return {
+        "value": round(value, 4),
+        "assessment": assessment,
+        "description": describe(assessment=assessment, value=display_value)
+    }
 
-# Load environment variables
-load_dotenv()
 
 # Tool function for risk analysis
 def analyze_risk(
@@ -31,69 +75,34 @@ def analyze_risk(
         Dictionary with risk analysis results and interpretation
     """
     # Interpret risk level
-    if risk_score <= 3:
-        risk_level = "LOW"
-        interpretation = "Your portfolio has low risk. It is well-diversified with stable assets."
-    elif risk_score <= 5:
-        risk_level = "MODERATE"
-        interpretation = "Your portfolio has moderate risk. Consider monitoring for concentration issues."
-    elif risk_score <= 7:
-        risk_level = "ELEVATED"
-        interpretation = "Your portfolio has elevated risk. You may want to consider rebalancing."
-    else:
-        risk_level = "HIGH"
-        interpretation = "Your portfolio has high risk. Immediate attention may be needed."
-    
-    # Interpret individual factors
-    volatility_assessment = "high" if volatility > 0.3 else "moderate" if volatility > 0.15 else "low"
-    concentration_assessment = "high" if concentration > 0.4 else "moderate" if concentration > 0.2 else "low"
-    correlation_assessment = "high" if correlation > 0.7 else "moderate" if correlation > 0.4 else "low"
+    level = risk_level_index(risk_score)
     
     return {
         "risk_score": risk_score,
-        "risk_level": risk_level,
-        "interpretation": interpretation,
-        "volatility": {
-            "value": round(volatility, 4),
-            "assessment": volatility_assessment,
-            "description": f"Portfolio volatility is {volatility_assessment} at {volatility*100:.1f}% annualized"
-        },
-        "concentration": {
-            "value": round(concentration, 4),
-            "assessment": concentration_assessment,
-            "description": f"Portfolio concentration is {concentration_assessment} (HHI: {concentration:.3f})"
-        },
-        "correlation": {
-            "value": round(correlation, 4),
-            "assessment": correlation_assessment,
-            "description": f"Asset correlation is {correlation_assessment} at {correlation:.2f}"
-        }
+        "risk_level": RISK_LEVELS[level],
+        "interpretation": _RISK_INTERPRETATIONS[level],
+        "volatility": _factor(volatility, _VOLATILITY_THRESHOLDS, _VOLATILITY_DESCRIPTION, volatility * 100),
+        "concentration": _factor(concentration, _CONCENTRATION_THRESHOLDS, _CONCENTRATION_DESCRIPTION, concentration),
+        "correlation": _factor(correlation, _CORRELATION_THRESHOLDS, _CORRELATION_DESCRIPTION, correlation)
     }
 
 
-# Define the Risk Analyzer Agent
-risk_analyzer_agent = LlmAgent(
-    name="RiskAnalyzer",
-    model="gemini-2.5-flash",
-    description="Analyzes portfolio risk including volatility, concentration, and correlation metrics",
-    instruction="""You are a professional portfolio risk analyst. Your task is to analyze the portfolio risk data provided and give a comprehensive risk assessment.
-
-When analyzing risk:
-1. Evaluate the overall risk score (1-10 scale, where 10 is highest risk)
-2. Break down the contributing factors: volatility, concentration (HHI), and correlation
-3. Provide actionable insights about what the risk metrics mean for the investor
-4. Be clear and educational in your explanations, especially for beginner investors
-
-Use the analyze_risk tool to process the portfolio data and generate your analysis.
-
-Format your response as a structured JSON with:
-- risk_score: The overall risk score (1-10)
-- risk_level: LOW, MODERATE, ELEVATED, or HIGH
-- interpretation: A brief explanation of what the risk level means
-- volatility: Details about portfolio volatility
-- concentration: Details about portfolio concentration
-- correlation: Details about asset correlation
-""",
-    tools=[analyze_risk],
-    output_key="risk_analysis"
-)
+def _build_agent():
+    """Define the Risk Analyzer Agent; ADK is only imported when the agent is first used."""
+    from google.adk.agents import LlmAgent
+    return LlmAgent(
+        name="RiskAnalyzer",
+        model="gemini-2.5-flash",
+        description="Analyzes portfolio risk including volatility, concentration, and correlation metrics",
+        instruction=load_instruction("risk"),
+        tools=[analyze_risk],
+        output_key="risk_analysis"
+    )
+
+
+def __getattr__(name):
+    # Built on first access (PEP 562) so importing the scoring helpers stays light
+    if name == "risk_analyzer_agent":
+        globals()[name] = _build_agent()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,12 +2,79 @@
 Scenario Agent using Google ADK.
 Models "what-if" scenarios for portfolio changes.
 """
-import os
+from dataclasses import dataclass, asdict
+from operator import attrgetter
+
 from google.adk.agents import LlmAgent
-from dotenv import load_dotenv
+from . import load_instruction
+
+
+@dataclass(slots=True, frozen=True)
+class ScenarioResult:
+    """Outcome of one simulated scenario; converted to a dict only at the tool boundary."""
+    scenario: str
+    scenario_type: str
+    current_value: float
+    new_value: float
+    current_risk_score: float
+    new_risk_score: float
+    risk_change: float
+    impact: str
+    analysis: str
+
+
+# Index funds typically reduce risk, high-volatility stocks increase it
+LOW_RISK_TICKERS = frozenset({"SPY", "VTI", "QQQ"})
+HIGH_RISK_TICKERS = frozenset({"TSLA", "NVDA", "COIN"})
+
+
+def _add_stock_risk_change(stock_symbol: str, current_portfolio_value: float) -> float:
+    """Estimate the risk change of adding a stock based on typical stock volatility."""
+    symbol = stock_symbol.upper()
+    if symbol in LOW_RISK_TICKERS:
+        return -0.8
+    if symbol in HIGH_RISK_TICKERS:
+        return 0.6
+    return 0.2  # Neutral impact
+
 
-# Load environment variables
-load_dotenv()
+def _add_stock_impact(risk_change: float) -> str:
+    return "POSITIVE" if risk_change < 0 else "NEGATIVE" if risk_change > 0.3 else "NEUTRAL"
+
+
+# Scenario dispatch table:
+# (value sign, risk change fn, clamp new value at 0, impact fn, scenario template, analysis template)
+_SCENARIO_PARAMS = {
+    # Adding a new stock typically increases diversification
+    "add_stock": (
+        1, _add_stock_risk_change, False, _add_stock_impact,
+        "Add ${amount:,.0f} to {symbol}",
+        "Adding {symbol} would change portfolio value to ${new_value:,.2f} and {direction} risk by {risk_points:.1f} points."
+    ),
+    # Removing a stock reduces diversification
+    "remove_stock": (
+        -1, lambda symbol, value: 0.3 if value > 0 else 0, True, lambda change: "CAUTIONARY",
+        "Sell {symbol} (${amount:,.0f})",
+        "Selling {symbol} would reduce portfolio to ${new_value:,.2f}. Consider the concentration impact on remaining positions."
+    ),
+    # Increasing position in existing stock generally increases concentration risk
+    "increase_position": (
+        1, lambda symbol, value: 0.4, False, lambda change: "CAUTIONARY",
+        "Increase {symbol} by ${amount:,.0f}",
+        "Increasing position in {symbol} would add ${amount:,.0f} but also increase concentration risk."
+    ),
+    # Decreasing a position may reduce concentration
+    "decrease_position": (
+        -1, lambda symbol, value: -0.2, True, lambda change: "POSITIVE",
+        "Decrease {symbol} by ${amount:,.0f}",
+        "Reducing {symbol} position could improve diversification and lower concentration risk."
+    ),
+}
+
+
+# Lowest projected risk wins; ties keep the earlier scenario
+_BY_NEW_RISK = attrgetter("new_risk_score")
+_BEST_SCENARIO_TEXT = "Based on analysis, '{scenario}' would result in the most favorable risk profile (Risk Score: {risk}).".format
 
 
 def simulate_scenario(
@@ -30,88 +97,44 @@ def simulate_scenario(
     Returns:
         Dictionary with scenario simulation results
     """
-    # Calculate simulated impacts
-    if scenario_type == "add_stock":
-        # Adding a new stock typically increases diversification
-        new_value = current_portfolio_value + change_amount
-        weight_change = change_amount / new_value
-        
-        # Estimate risk change based on typical stock volatility
-        if stock_symbol.upper() in ["SPY", "VTI", "QQQ"]:
-            # Index funds typically reduce risk
-            risk_change = -0.8
-        elif stock_symbol.upper() in ["TSLA", "NVDA", "COIN"]:
-            # High-volatility stocks increase risk
-            risk_change = 0.6
-        else:
-            risk_change = 0.2  # Neutral impact
-        
-        new_risk = round(min(10, max(1, current_risk_score + risk_change)), 2)
-        
-        return {
-            "scenario": f"Add ${change_amount:,.0f} to {stock_symbol}",
-            "scenario_type": scenario_type,
-            "current_value": current_portfolio_value,
-            "new_value": new_value,
-            "current_risk_score": current_risk_score,
-            "new_risk_score": new_risk,
-            "risk_change": round(risk_change, 2),
-            "impact": "POSITIVE" if risk_change < 0 else "NEGATIVE" if risk_change > 0.3 else "NEUTRAL",
-            "analysis": f"Adding {stock_symbol} would change portfolio value to ${new_value:,.2f} and {'reduce' if risk_change < 0 else 'increase'} risk by {abs(risk_change):.1f} points."
-        }
-    
-    elif scenario_type == "remove_stock":
-        # Removing a stock reduces diversification
-        new_value = current_portfolio_value - change_amount
-        risk_change = 0.3 if current_portfolio_value > 0 else 0
-        new_risk = round(min(10, max(1, current_risk_score + risk_change)), 2)
-        
-        return {
-            "scenario": f"Sell {stock_symbol} (${change_amount:,.0f})",
-            "scenario_type": scenario_type,
-            "current_value": current_portfolio_value,
-            "new_value": max(0, new_value),
-            "current_risk_score": current_risk_score,
-            "new_risk_score": new_risk,
-            "risk_change": round(risk_change, 2),
-            "impact": "CAUTIONARY",
-            "analysis": f"Selling {stock_symbol} would reduce portfolio to ${new_value:,.2f}. Consider the concentration impact on remaining positions."
-        }
+    return asdict(_simulate(scenario_type, current_portfolio_value, current_risk_score, stock_symbol, change_amount))
+
+
+def _simulate(
+    scenario_type: str,
+    current_portfolio_value: float,
+    current_risk_score: float,
+    stock_symbol: str,
+    change_amount: float
+) -> ScenarioResult:
+    """Compute a scenario as a ScenarioResult record."""
+    # Unknown scenario types are treated as decreasing the position
+    sign, risk_fn, clamp_value, impact_fn, scenario_text, analysis_text = _SCENARIO_PARAMS.get(
+        scenario_type, _SCENARIO_PARAMS["decrease_position"]
+    )
     
-    elif scenario_type == "increase_position":
-        # Increasing position in existing stock
-        new_value = current_portfolio_value + change_amount
-        risk_change = 0.4  # Generally increases concentration risk
-        new_risk = round(min(10, max(1, current_risk_score + risk_change)), 2)
-        
-        return {
-            "scenario": f"Increase {stock_symbol} by ${change_amount:,.0f}",
-            "scenario_type": scenario_type,
-            "current_value": current_portfolio_value,
-            "new_value": new_value,
-            "current_risk_score": current_risk_score,
-            "new_risk_score": new_risk,
-            "risk_change": round(risk_change, 2),
-            "impact": "CAUTIONARY",
-            "analysis": f"Increasing position in {stock_symbol} would add ${change_amount:,.0f} but also increase concentration risk."
-        }
+    # Calculate simulated impacts
+    new_value = current_portfolio_value + sign * change_amount
+    risk_change = risk_fn(stock_symbol, current_portfolio_value)
+    new_risk = round(min(10, max(1, current_risk_score + risk_change)), 2)
     
-    else:  # decrease_position
-        new_value = current_portfolio_value - change_amount
-        risk_change = -0.2  # May reduce concentration
-        new_risk = round(min(10, max(1, current_risk_score + risk_change)), 2)
-        
-        return {
-            "scenario": f"Decrease {stock_symbol} by ${change_amount:,.0f}",
-            "scenario_type": scenario_type,
-            "current_value": current_portfolio_value,
-            "new_value": max(0, new_value),
-            "current_risk_score": current_risk_score,
-            "new_risk_score": new_risk,
-            "risk_change": round(risk_change, 2),
-            "impact": "POSITIVE",
-            "analysis": f"Reducing {stock_symbol} position could improve diversification and lower concentration risk."
-        }
+    return ScenarioResult(
+        scenario=scenario_text.format(symbol=stock_symbol, amount=change_amount),
+        scenario_type=scenario_type,
+        current_value=current_portfolio_value,
+        new_value=max(0, new_value) if clamp_value else new_value,
+        current_risk_score=current_risk_score,
+        new_risk_score=new_risk,
+        risk_change=round(risk_change, 2),
+        impact=impact_fn(risk_change),
+        analysis=analysis_text.format(
+            symbol=stock_symbol,
+            amount=change_amount,
+            new_value=new_value,
+            direction="reduce" if risk_change < 0 else "increase",
+            risk_points=abs(risk_change)
+        )
+    )
 
 
 def run_multiple_scenarios(
@@ -132,45 +155,26 @@ def run_multiple_scenarios(
     Returns:
         Dictionary with multiple scenario comparisons
     """
-    scenarios = []
-    
-    # Scenario 1: Add index fund
-    scenarios.append(simulate_scenario(
-        "add_stock",
-        portfolio_value,
-        risk_score,
-        "SPY",
-        10000
-    ))
-    
-    # Scenario 2: Increase largest position
-    scenarios.append(simulate_scenario(
-        "increase_position",
-        portfolio_value,
-        risk_score,
-        largest_holding,
-        5000
-    ))
-    
-    # Scenario 3: Decrease largest position
-    scenarios.append(simulate_scenario(
-        "decrease_position",
-        portfolio_value,
-        risk_score,
-        largest_holding,
-        largest_holding_value * 0.3  # Reduce by 30%
-    ))
+    scenarios = [
+        # Scenario 1: Add index fund
+        _simulate("add_stock", portfolio_value, risk_score, "SPY", 10000),
+        # Scenario 2: Increase largest position
+        _simulate("increase_position", portfolio_value, risk_score, largest_holding, 5000),
+        # Scenario 3: Decrease largest position
+        _simulate("decrease_position", portfolio_value, risk_score, largest_holding, largest_holding_value * 0.3),  # Reduce by 30%
+    ]
+    best_scenario = min(scenarios, key=_BY_NEW_RISK)
     
     return {
-        "scenarios": scenarios,
-        "recommendation": get_scenario_recommendation(scenarios)
+        "scenarios": [asdict(s) for s in scenarios],
+        "recommendation": _BEST_SCENARIO_TEXT(scenario=best_scenario.scenario, risk=best_scenario.new_risk_score)
     }
 
 
 def get_scenario_recommendation(scenarios: list) -> str:
     """Get recommendation based on scenario analysis."""
     best_scenario = min(scenarios, key=lambda x: x.get("new_risk_score", 10))
-    return f"Based on analysis, '{best_scenario['scenario']}' would result in the most favorable risk profile (Risk Score: {best_scenario['new_risk_score']})."
+    return _BEST_SCENARIO_TEXT(scenario=best_scenario['scenario'], risk=best_scenario['new_risk_score'])
 
 
 # Define the Scenario Agent
@@ -178,27 +182,7 @@ scenario_agent = LlmAgent(
     name="ScenarioAgent",
     model="gemini-2.5-flash",
     description="Models what-if scenarios to help investors understand the impact of portfolio changes",
-    instruction="""You are a portfolio scenario analyst. Your job is to help investors understand how different actions would affect their portfolio risk and returns.
-
-For each portfolio:
-1. Identify potential scenarios to model (add stocks, remove stocks, rebalance)
-2. Calculate the impact of each scenario on risk score and portfolio value
-3. Compare scenarios and highlight the best options
-4. Present results in a clear, comparative format
-
-Common scenarios to model:
-- Adding $10,000 to an index fund (SPY/VTI)
-- Increasing position in largest holding
-- Reducing concentrated positions
-- Adding diversification through new sectors
-
-Use the simulate_scenario and run_multiple_scenarios tools to generate analysis.
-
-Format output to show:
-- Current state
-- Each scenario with projected changes
-- Recommendation based on risk improvement
-""",
+    instruction=load_instruction("scenario"),
     tools=[simulate_scenario, run_multiple_scenarios],
     output_key="scenarios"
 )
@@ -4,22 +4,54 @@ Analyzes individual stocks with risk assessment and Hold/Sell recommendations.
 Uses Alpha Vantage for real data with fallback to mock data.
 """
 import os
-import requests
-from google.adk.agents import LlmAgent
-from dotenv import load_dotenv
+import time
+import heapq
+from dataclasses import dataclass, asdict, fields
+from functools import lru_cache
+from operator import attrgetter
+from types import MappingProxyType
+from typing import Optional
 
-# Load environment variables
-load_dotenv()
+import numpy as np
+import orjson
+from . import load_instruction
+from .risk_analyzer_agent import RISK_LEVELS, risk_level_index, risk_level_indices
+from .market_analyzer_agent import fetch_global_quotes, STOCK_PRICE_TTL
+from ._quote_cache import quote_cache
 
-# Alpha Vantage API
-ALPHA_VANTAGE_BASE_URL = "https://www.alphavantage.co/query"
 
-# Mock volatility data for fallback
-MOCK_VOLATILITY = {
+@dataclass(slots=True, frozen=True)
+class StockAnalysis:
+    """One analyze_all_stocks entry; converted to a dict only at the tool boundary."""
+    symbol: str
+    current_value: float
+    portfolio_weight: float
+    volatility: float
+    gain_loss_percent: float
+    risk_score: float
+    risk_level: str
+    recommendation: str
+    confidence: str
+    action: str
+    reasons: tuple[str, ...]
+
+
+# Mock volatility data for fallback (read-only view)
+MOCK_VOLATILITY = MappingProxyType({
     "AAPL": 0.28, "GOOGL": 0.32, "MSFT": 0.25, "AMZN": 0.35, 
     "TSLA": 0.55, "NVDA": 0.52, "META": 0.40, "SPY": 0.15,
     "QQQ": 0.22, "VTI": 0.14, "INFY": 0.30, "TCS": 0.28
-}
+})
+DEFAULT_MOCK_VOLATILITY = 0.35
+
+
+# Prices used when Alpha Vantage is unavailable (read-only view)
+MOCK_PRICES = MappingProxyType({
+    "AAPL": 195.50, "GOOGL": 142.80, "MSFT": 378.90, "AMZN": 178.25,
+    "TSLA": 248.50, "NVDA": 495.80, "META": 325.40, "SPY": 458.25,
+    "QQQ": 392.80, "VTI": 238.50, "INFY": 18.25, "TCS": 3850.00
+})
+DEFAULT_MOCK_PRICE = 100.0
 
 
 def get_stock_data(symbol: str) -> dict:
@@ -34,51 +66,121 @@ def get_stock_data(symbol: str) -> dict:
         Dictionary with stock data including price, change, volume
     """
     symbol = symbol.upper().strip()
+    # Repeat lookups within the same minute are served from memory; copy so callers can't mutate the cache
+    return dict(_get_stock_data_cached(symbol, int(time.time() // 60)))
+
+
+@lru_cache(maxsize=256)
+def _get_stock_data_cached(symbol: str, minute_bucket: int) -> dict:
+    """get_stock_data for one symbol, memoized per (symbol, minute)."""
+    return get_stock_data_batch([symbol])[symbol]
+
+
+def get_stock_data_batch(symbols: list[str]) -> dict:
+    """
+    Fetch stock data for several symbols at once.
+    Quotes are requested concurrently, so N symbols cost roughly one round-trip.
+    
+    Args:
+        symbols: List of stock ticker symbols
+        
+    Returns:
+        Dictionary mapping each symbol to its get_stock_data result
+    """
+    unique_symbols = list(dict.fromkeys(s.upper().strip() for s in symbols))
     api_key = os.getenv("ALPHA_VANTAGE_API_KEY", "")
     
+    # Serve recent quotes from the on-disk cache and only fetch the rest
+    raw = {}
     if api_key:
+        for symbol in unique_symbols:
+            cached = quote_cache.get(symbol, ttl=STOCK_PRICE_TTL)
+            if cached is not None:
+                raw[symbol] = cached
+    
+    pending = [s for s in unique_symbols if s not in raw]
+    if api_key and pending:
         try:
-            # Fetch current quote
-            params = {
-                "function": "GLOBAL_QUOTE",
+            fetched = fetch_global_quotes(pending)
+        except Exception as e:
+            fetched = [e] * len(pending)
+        for symbol, data in zip(pending, fetched):
+            raw[symbol] = data
+            # Cache only real quotes so rate-limit notes are retried next time
+            if isinstance(data, dict) and data.get("Global Quote"):
+                quote_cache.set(symbol, data)
+    
+    return {symbol: _stock_data_result(symbol, raw.get(symbol)) for symbol in unique_symbols}
+
+
+def _stock_data_result(symbol: str, data) -> dict:
+    """Build a get_stock_data result from GLOBAL_QUOTE JSON, falling back to mock data."""
+    try:
+        if isinstance(data, BaseException):
+            raise data
+        if data and "Global Quote" in data and data["Global Quote"]:
+            quote = data["Global Quote"]
+            return {
                 "symbol": symbol,
-                "apikey": api_key
+                "price": float(quote.get("05. price", 0)),
+                "change": float(quote.get("09. change", 0)),
+                "change_percent": quote.get("10. change percent", "0%"),
+                "volume": int(quote.get("06. volume", 0)),
+                "previous_close": float(quote.get("08. previous close", 0)),
+                "source": "alpha_vantage"
             }
-            response = requests.get(ALPHA_VANTAGE_BASE_URL, params=params, timeout=10)
-            data = response.json()
-            
-            if "Global Quote" in data and data["Global Quote"]:
-                quote = data["Global Quote"]
-                return {
-                    "symbol": symbol,
-                    "price": float(quote.get("05. price", 0)),
-                    "change": float(quote.get("09. change", 0)),
-                    "change_percent": quote.get("10. change percent", "0%"),
-                    "volume": int(quote.get("06. volume", 0)),
-                    "previous_close": float(quote.get("08. previous close", 0)),
-                    "source": "alpha_vantage"
-                }
-        except Exception as e:
-            print(f"⚠️ Alpha Vantage API error for {symbol}: {e}")
+    except Exception as e:
+        print(f"⚠️ Alpha Vantage API error for {symbol}: {e}")
     
     # Fallback to mock data
-    mock_prices = {
-        "AAPL": 195.50, "GOOGL": 142.80, "MSFT": 378.90, "AMZN": 178.25,
-        "TSLA": 248.50, "NVDA": 495.80, "META": 325.40, "SPY": 458.25,
-        "QQQ": 392.80, "VTI": 238.50, "INFY": 18.25, "TCS": 3850.00
-    }
-    
+    mock_price = MOCK_PRICES.get(symbol, DEFAULT_MOCK_PRICE)
     return {
         "symbol": symbol,
-        "price": mock_prices.get(symbol, 100.0),
+        "price": mock_price,
         "change": 0.0,
         "change_percent": "0%",
         "volume": 0,
-        "previous_close": mock_prices.get(symbol, 100.0),
+        "previous_close": mock_price,
         "source": "mock_fallback"
     }
 
 
+def _is_whole_risk_score(volatility: float, portfolio_weight: float) -> bool:
+    """
+    Whether a holding's risk score is a whole number of points: the volatility points
+    are capped (or the volatility is an int) and so are the concentration points.
+    Whole scores read "8/10" rather than "8.0/10" in the reasons.
+    """
+    return (volatility * 10 > 5 or isinstance(volatility, int)) and portfolio_weight / 10 > 3
+
+
+def _clamp_risk_score(raw_score: float, whole: bool = False) -> float:
+    """Round a raw risk score to one decimal and clamp it to 1-10; whole scores stay ints."""
+    return min(10, max(1, round(int(raw_score) if whole else raw_score, 1)))
+
+
+def _compute_risk(volatility: float, portfolio_weight: float, gain_loss_percent: float) -> float:
+    """
+    Risk score (1-10) for one holding; the scalar form of _risk_score_kernel.
+    
+    Args:
+        volatility: Volatility (0-1 scale)
+        portfolio_weight: Portfolio weight in percent
+        gain_loss_percent: Gain or loss percentage
+        
+    Returns:
+        Rounded and clamped risk score
+    """
+    # Factors: volatility, concentration (portfolio weight), loss position
+    volatility_risk = min(volatility * 10, 5)  # 0-5 points
+    concentration_risk = min(portfolio_weight / 10, 3)  # 0-3 points if > 30%
+    loss_risk = 2 if gain_loss_percent < -10 else (1 if gain_loss_percent < 0 else 0)
+    return _clamp_risk_score(
+        volatility_risk + concentration_risk + loss_risk,
+        _is_whole_risk_score(volatility, portfolio_weight)
+    )
+
+
 def analyze_stock_risk(
     symbol: str,
     quantity: float,
@@ -106,26 +208,13 @@ def analyze_stock_risk(
     gain_loss_percent = ((current_price - purchase_price) / purchase_price) * 100 if purchase_price > 0 else 0
     
     # Get volatility (use mock if not available)
-    volatility = MOCK_VOLATILITY.get(symbol, 0.35)
+    volatility = MOCK_VOLATILITY.get(symbol, DEFAULT_MOCK_VOLATILITY)
     
     # Calculate risk score for this stock (1-10)
-    # Factors: volatility, concentration (portfolio weight), loss position
-    volatility_risk = min(volatility * 10, 5)  # 0-5 points
-    concentration_risk = min(portfolio_weight / 10, 3)  # 0-3 points if > 30%
-    loss_risk = 2 if gain_loss_percent < -10 else (1 if gain_loss_percent < 0 else 0)
-    
-    stock_risk_score = round(volatility_risk + concentration_risk + loss_risk, 1)
-    stock_risk_score = min(10, max(1, stock_risk_score))
+    stock_risk_score = _compute_risk(volatility, portfolio_weight, gain_loss_percent)
     
     # Determine risk level
-    if stock_risk_score <= 3:
-        risk_level = "LOW"
-    elif stock_risk_score <= 5:
-        risk_level = "MODERATE"
-    elif stock_risk_score <= 7:
-        risk_level = "ELEVATED"
-    else:
-        risk_level = "HIGH"
+    risk_level = RISK_LEVELS[risk_level_index(stock_risk_score)]
     
     return {
         "symbol": symbol,
@@ -164,8 +253,8 @@ def generate_stock_recommendation(
     """
     symbol = symbol.upper()
     
-    # Decision logic
-    reasons = []
+    # Decision logic; signals are recorded as (reason key, value) and only formatted at the end
+    signals = []
     recommendation = "HOLD"
     confidence = "MEDIUM"
     
@@ -174,34 +263,34 @@ def generate_stock_recommendation(
     
     if risk_score >= 7:
         sell_signals += 1
-        reasons.append(f"High risk score ({risk_score}/10)")
+        signals.append(("high_risk", risk_score))
     
     if gain_loss_percent < -15:
         sell_signals += 1
-        reasons.append(f"Significant loss ({gain_loss_percent:.1f}%)")
+        signals.append(("big_loss", gain_loss_percent))
     
     if portfolio_weight > 35:
         sell_signals += 1
-        reasons.append(f"Over-concentrated ({portfolio_weight:.1f}% of portfolio)")
+        signals.append(("concentrated", portfolio_weight))
     
     if volatility > 45:
         sell_signals += 1
-        reasons.append(f"High volatility ({volatility:.1f}%)")
+        signals.append(("volatile", volatility))
     
     # Check for strong HOLD/BUY signals
     hold_signals = 0
     
     if gain_loss_percent > 20:
         hold_signals += 1
-        reasons.append(f"Strong gains ({gain_loss_percent:.1f}%)")
+        signals.append(("strong_gain", gain_loss_percent))
     
     if risk_score <= 3:
         hold_signals += 1
-        reasons.append(f"Low risk profile")
+        signals.append(("low_risk", risk_score))
     
     if volatility < 20 and portfolio_weight < 25:
         hold_signals += 1
-        reasons.append("Well-balanced stable position")
+        signals.append(("balanced", None))
     
     # Determine recommendation
     if sell_signals >= 2:
@@ -217,135 +306,305 @@ def generate_stock_recommendation(
         recommendation = "HOLD"
         confidence = "LOW"
     
-    # Build action text
-    if recommendation == "SELL":
-        action = f"Consider selling {symbol} to reduce portfolio risk"
-    elif recommendation == "REDUCE":
-        action = f"Consider reducing your {symbol} position by 25-50%"
-    else:
-        action = f"Keep holding {symbol} - no immediate action needed"
-    
+    reasons = [_REASON_TEMPLATES[key](value=value) for key, value in signals]
+    return _recommendation_result(symbol, recommendation, confidence, reasons)
+
+
+# Reason text per signal, in the order signals are checked
+_REASON_TEMPLATES = {
+    "high_risk": "High risk score ({value}/10)".format,
+    "big_loss": "Significant loss ({value:.1f}%)".format,
+    "concentrated": "Over-concentrated ({value:.1f}% of portfolio)".format,
+    "volatile": "High volatility ({value:.1f}%)".format,
+    "strong_gain": "Strong gains ({value:.1f}%)".format,
+    "low_risk": "Low risk profile".format,
+    "balanced": "Well-balanced stable position".format,
+}
+_SIGNAL_ORDER = tuple(_REASON_TEMPLATES)
+
+# Action text per recommendation; anything else is a HOLD
+_ACTION_TEXT = {
+    "SELL": "Consider selling {symbol} to reduce portfolio risk".format,
+    "REDUCE": "Consider reducing your {symbol} position by 25-50%".format,
+}
+_HOLD_ACTION_TEXT = "Keep holding {symbol} - no immediate action needed".format
+_NO_SIGNAL_REASONS = ("Position is balanced and within normal parameters",)
+
+
+def _recommendation_result(symbol: str, recommendation: str, confidence: str, reasons: list) -> dict:
+    """Build the recommendation dict shared by the single and batch paths."""
     return {
         "symbol": symbol,
         "recommendation": recommendation,
         "confidence": confidence,
-        "action": action,
-        "reasons": reasons if reasons else ["Position is balanced and within normal parameters"]
+        "action": _ACTION_TEXT.get(recommendation, _HOLD_ACTION_TEXT)(symbol=symbol),
+        "reasons": reasons if reasons else list(_NO_SIGNAL_REASONS)
     }
 
 
-def analyze_all_stocks(holdings_json: str) -> dict:
+def _recommend_batch(
+    symbols: list,
+    risk_scores: list,
+    gain_loss_percents: list,
+    portfolio_weights: list,
+    volatilities: list
+) -> list:
+    """
+    generate_stock_recommendation for many holdings at once.
+    
+    Signals are evaluated as boolean arrays and the recommendation and confidence
+    are picked with np.select; reason strings are only built for holdings that
+    raised at least one signal.
+    
+    Args:
+        symbols: Stock ticker symbols
+        risk_scores: Individual stock risk scores (1-10)
+        gain_loss_percents: Gain or loss percentages
+        portfolio_weights: Percentages of portfolio
+        volatilities: Stock volatility percentages
+        
+    Returns:
+        List of recommendation dicts aligned with symbols
+    """
+    risk = np.array(risk_scores, dtype=float)
+    gl_pct = np.array(gain_loss_percents, dtype=float)
+    weight = np.array(portfolio_weights, dtype=float)
+    vol_pct = np.array(volatilities, dtype=float)
+    
+    # SELL signals
+    high_risk = risk >= 7
+    big_loss = gl_pct < -15
+    concentrated = weight > 35
+    volatile = vol_pct > 45
+    sell_count = high_risk.astype(np.int8) + big_loss + concentrated + volatile
+    
+    # Strong HOLD/BUY signals
+    strong_gain = gl_pct > 20
+    low_risk = risk <= 3
+    balanced = (vol_pct < 20) & (weight < 25)
+    hold_count = strong_gain.astype(np.int8) + low_risk + balanced
+    
+    reduce = (sell_count == 1) & (hold_count == 0)
+    recommendations = np.select([sell_count >= 2, reduce], ["SELL", "REDUCE"], default="HOLD").tolist()
+    confidences = np.select(
+        [sell_count >= 3, sell_count >= 2, reduce, hold_count >= 2],
+        ["HIGH", "MEDIUM", "MEDIUM", "HIGH"],
+        default="LOW"
+    ).tolist()
+    
+    # Columns follow _SIGNAL_ORDER
+    flags = np.column_stack((high_risk, big_loss, concentrated, volatile, strong_gain, low_risk, balanced)).tolist()
+    results = []
+    for i, symbol in enumerate(symbols):
+        symbol = symbol.upper()
+        reasons = []
+        # Reason strings are only built for holdings that raised a signal
+        if sell_count[i] or hold_count[i]:
+            values = (risk_scores[i], gain_loss_percents[i], portfolio_weights[i], volatilities[i],
+                      gain_loss_percents[i], risk_scores[i], None)
+            reasons = [
+                _REASON_TEMPLATES[key](value=value)
+                for key, fired, value in zip(_SIGNAL_ORDER, flags[i], values) if fired
+            ]
+        results.append(_recommendation_result(symbol, recommendations[i], confidences[i], reasons))
+    return results
+
+
+def _risk_score_kernel(vol: np.ndarray, weight: np.ndarray, gl_pct: np.ndarray) -> np.ndarray:
+    """
+    Unrounded 1-10 risk scores for aligned float64 arrays of holdings.
+    Vectorized form of _compute_risk; finish each score with _clamp_risk_score.
+    
+    Args:
+        vol: Volatilities (0-1 scale)
+        weight: Portfolio weights in percent
+        gl_pct: Gain or loss percentages
+        
+    Returns:
+        Array of raw risk scores, before rounding and clamping
+    """
+    scores = np.minimum(vol * 10, 5)
+    scores += np.minimum(weight / 10, 3)
+    # One point for any loss, a second one past -10%
+    scores += (gl_pct < 0).astype(np.int8) + (gl_pct < -10)
+    return scores
+
+
+_BY_RISK_SCORE = attrgetter("risk_score")
+_MISSING = object()
+_STOCK_ANALYSIS_FIELDS = tuple(f.name for f in fields(StockAnalysis))
+
+
+def _to_columnar(stock_analyses: list) -> dict:
+    """One list per StockAnalysis field, aligned by row, so field names appear once."""
+    columns = {name: [getattr(s, name) for s in stock_analyses] for name in _STOCK_ANALYSIS_FIELDS}
+    columns["reasons"] = [list(reasons) for reasons in columns["reasons"]]
+    return columns
+
+
+def _to_row(stock_analysis: StockAnalysis) -> dict:
+    """asdict for one record, with its reasons as a list like the rest of the tool output."""
+    row = asdict(stock_analysis)
+    row["reasons"] = list(stock_analysis.reasons)
+    return row
+
+
+def stock_columns_to_rows(stock_columns: dict) -> list:
+    """
+    Turn analyze_all_stocks(..., columnar=True) columns back into per-stock dicts.
+    
+    Args:
+        stock_columns: The "stock_columns" mapping of field name to values
+        
+    Returns:
+        List of per-stock dicts, as returned in "stock_analyses"
+    """
+    return [dict(zip(stock_columns, row)) for row in zip(*stock_columns.values())]
+
+
+def analyze_all_stocks(holdings_json: str, top_k: Optional[int] = None, columnar: bool = False) -> dict:
     """
     Analyze all stocks in a portfolio and generate recommendations.
     
     Args:
         holdings_json: JSON string or list of holdings with symbol, value, weight, individual_volatility
+        top_k: Only return the top_k riskiest stocks (counts still cover every holding)
+        columnar: Return "stock_columns" (one list per field) instead of "stock_analyses" rows;
+            much more compact for large portfolios
         
     Returns:
         Dictionary with analysis for each stock
     """
-    import json
-    
     try:
-        holdings = json.loads(holdings_json) if isinstance(holdings_json, str) else holdings_json
+        holdings = orjson.loads(holdings_json) if isinstance(holdings_json, (str, bytes)) else holdings_json
     except:
         return {"error": "Invalid holdings data", "stock_analyses": []}
     
     if not holdings:
         return {"stock_count": 0, "high_risk_count": 0, "sell_recommendations": 0, "stock_analyses": []}
     
-    stock_analyses = []
-    total_value = sum(h.get("value", 0) for h in holdings)
+    # Portfolio total is only needed to derive missing weights
+    if all("weight" in h for h in holdings):
+        total_value = 0
+    else:
+        total_value = sum(h.get("value", 0) for h in holdings)
     
+    # Gather per-holding inputs once, then score every holding in a single array pass
+    symbols, values, weights, volatilities, gain_loss_percents = [], [], [], [], []
+    mock_volatility = MOCK_VOLATILITY.get
     for holding in holdings:
-        symbol = holding.get("symbol", "UNKNOWN")
+        # One bound lookup method per holding; _MISSING tells absent keys from explicit values
+        get = holding.get
+        symbol = get("symbol", "UNKNOWN")
         # Get value directly from holdings_analysis (already calculated)
-        value = holding.get("value", 0)
+        value = get("value", 0)
         # Use weight from data, or calculate it
-        weight = holding.get("weight", (value / total_value * 100) if total_value > 0 else 0)
+        weight = get("weight", _MISSING)
+        if weight is _MISSING:
+            weight = (value / total_value * 100) if total_value > 0 else 0
         # Use individual_volatility if provided, else use mock
-        volatility = holding.get("individual_volatility", MOCK_VOLATILITY.get(symbol.upper(), 0.35))
+        volatility = get("individual_volatility", _MISSING)
+        if volatility is _MISSING:
+            volatility = mock_volatility(symbol.upper(), DEFAULT_MOCK_VOLATILITY)
         
         # For gain/loss, we'd need purchase data - use 0% if not available
         # In production, this would come from the original holdings
-        purchase_price = holding.get("purchase_price", 0)
-        current_price = holding.get("current_price", 0)
-        quantity = holding.get("quantity", 0)
+        purchase_price = get("purchase_price", 0)
+        current_price = get("current_price", 0)
         
         # If we have price data, calculate gain/loss
         if purchase_price > 0 and current_price > 0:
             gain_loss_percent = ((current_price - purchase_price) / purchase_price) * 100
-            gain_loss = (current_price - purchase_price) * quantity
         else:
             gain_loss_percent = 0
-            gain_loss = 0
-        
-        # Calculate risk score based on available data
-        # Factors: volatility, concentration (portfolio weight)
-        volatility_risk = min(volatility * 10, 5)  # 0-5 points (volatility is 0-1 scale)
-        concentration_risk = min(weight / 10, 3)  # 0-3 points
-        loss_risk = 2 if gain_loss_percent < -10 else (1 if gain_loss_percent < 0 else 0)
         
-        stock_risk_score = round(volatility_risk + concentration_risk + loss_risk, 1)
-        stock_risk_score = min(10, max(1, stock_risk_score))
-        
-        # Determine risk level
-        if stock_risk_score <= 3:
-            risk_level = "LOW"
-        elif stock_risk_score <= 5:
-            risk_level = "MODERATE"
-        elif stock_risk_score <= 7:
-            risk_level = "ELEVATED"
-        else:
-            risk_level = "HIGH"
-        
-        # Generate recommendation
-        recommendation = generate_stock_recommendation(
-            symbol=symbol,
+        symbols.append(symbol)
+        values.append(value)
+        weights.append(weight)
+        volatilities.append(volatility)
+        gain_loss_percents.append(gain_loss_percent)
+    
+    # Calculate risk scores based on available data
+    raw_scores = _risk_score_kernel(
+        np.array(volatilities, dtype=np.float64),
+        np.array(weights, dtype=np.float64),
+        np.array(gain_loss_percents, dtype=np.float64)
+    ).tolist()
+    
+    # Python's round() keeps the exact scalar rounding the scores have always used
+    risk_scores = [
+        _clamp_risk_score(raw_score, _is_whole_risk_score(volatility, weight))
+        for raw_score, volatility, weight in zip(raw_scores, volatilities, weights)
+    ]
+    recommendations = _recommend_batch(
+        symbols, risk_scores, gain_loss_percents, weights,
+        [volatility * 100 for volatility in volatilities]  # Convert to percentage
+    )
+    
+    stock_analyses = []
+    high_risk_count = 0
+    sell_recommendations = 0
+    # Determine risk levels
+    level_indices = risk_level_indices(risk_scores)
+    for value, weight, volatility, gain_loss_percent, stock_risk_score, level, recommendation in zip(
+        values, weights, volatilities, gain_loss_percents, risk_scores, level_indices, recommendations
+    ):
+        risk_level = RISK_LEVELS[level]
+        # Count over every holding, before any top_k cut
+        if risk_level in ("HIGH", "ELEVATED"):
+            high_risk_count += 1
+        if recommendation["recommendation"] in ("SELL", "REDUCE"):
+            sell_recommendations += 1
+        stock_analyses.append(StockAnalysis(
+            symbol=recommendation["symbol"],
+            current_value=round(value, 2),
+            portfolio_weight=round(weight, 1),
+            volatility=round(volatility * 100, 1),
+            gain_loss_percent=round(gain_loss_percent, 1),
             risk_score=stock_risk_score,
-            gain_loss_percent=gain_loss_percent,
-            portfolio_weight=weight,
-            volatility=volatility * 100  # Convert to percentage
-        )
-        
-        stock_analyses.append({
-            "symbol": symbol,
-            "current_value": round(value, 2),
-            "portfolio_weight": round(weight, 1),
-            "volatility": round(volatility * 100, 1),
-            "gain_loss_percent": round(gain_loss_percent, 1),
-            "risk_score": stock_risk_score,
-            "risk_level": risk_level,
-            **recommendation
-        })
-    
-    # Sort by risk score (highest first)
-    stock_analyses.sort(key=lambda x: x["risk_score"], reverse=True)
+            risk_level=risk_level,
+            recommendation=recommendation["recommendation"],
+            confidence=recommendation["confidence"],
+            action=recommendation["action"],
+            reasons=tuple(recommendation["reasons"])
+        ))
+    
+    stock_count = len(stock_analyses)
+    
+    # Sort by risk score (highest first); a partial heap select is enough for top_k
+    if top_k is not None and top_k < stock_count:
+        stock_analyses = heapq.nlargest(max(top_k, 0), stock_analyses, key=_BY_RISK_SCORE)
+    else:
+        stock_analyses.sort(key=_BY_RISK_SCORE, reverse=True)
     
-    return {
-        "stock_count": len(stock_analyses),
-        "high_risk_count": sum(1 for s in stock_analyses if s["risk_level"] in ["HIGH", "ELEVATED"]),
-        "sell_recommendations": sum(1 for s in stock_analyses if s["recommendation"] in ["SELL", "REDUCE"]),
-        "stock_analyses": stock_analyses
+    result = {
+        "stock_count": stock_count,
+        "high_risk_count": high_risk_count,
+        "sell_recommendations": sell_recommendations
     }
+    if columnar:
+        result["stock_columns"] = _to_columnar(stock_analyses)
+    else:
+        result["stock_analyses"] = [_to_row(s) for s in stock_analyses]
+    return result
+
+
+def _build_agent():
+    """Define the Stock Analyzer Agent with tools; ADK is only imported when the agent is first used."""
+    from google.adk.agents import LlmAgent
+    return LlmAgent(
+        name="StockAnalyzer",
+        model="gemini-2.5-flash",
+        description="Analyzes individual stocks in a portfolio with risk levels and Hold/Sell recommendations",
+        instruction=load_instruction("stock_analyzer"),
+        tools=[get_stock_data, get_stock_data_batch, analyze_stock_risk, generate_stock_recommendation, analyze_all_stocks],
+        output_key="stock_analysis"
+    )
 
 
-# Define the Stock Analyzer Agent with tools
-stock_analyzer_agent = LlmAgent(
-    name="StockAnalyzer",
-    model="gemini-2.5-flash",
-    description="Analyzes individual stocks in a portfolio with risk levels and Hold/Sell recommendations",
-    instruction="""You are an expert stock analyst. For each stock in a portfolio, you analyze:
-1. Individual risk level based on volatility, concentration, and performance
-2. Whether to HOLD, REDUCE, or SELL the position
-3. Clear reasoning for your recommendation
-
-Use the analyze_all_stocks tool to get detailed analysis for all holdings.
-After receiving the results, summarize the key findings and highlight any stocks that need attention.
-
-Always be clear about which stocks are high-risk and explain why.
-Provide actionable advice for each stock position.
-""",
-    tools=[get_stock_data, analyze_stock_risk, generate_stock_recommendation, analyze_all_stocks],
-    output_key="stock_analysis"
-)
+def __getattr__(name):
+    # Built on first access (PEP 562) so importing the scoring helpers stays light
+    if name == "stock_analyzer_agent":
+        globals()[name] = _build_agent()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
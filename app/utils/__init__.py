@@ -1,5 +1,5 @@
 """Utility modules for the Investment Risk Scorer."""
-from .price_fetcher import fetch_current_price, fetch_historical_prices
+from .price_fetcher import fetch_current_price, fetch_historical_prices, fetch_price_bundle
 from .calculations import (
     calculate_volatility,
     calculate_hhi,
@@ -11,6 +11,7 @@ from .portfolio_validator import validate_portfolio, parse_csv_portfolio
 __all__ = [
     'fetch_current_price',
     'fetch_historical_prices',
+    'fetch_price_bundle',
     'calculate_volatility',
     'calculate_hhi',
     'calculate_correlation',
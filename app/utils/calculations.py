@@ -6,6 +6,17 @@ import numpy as np
 from typing import Optional
 
 
+def _returns_array(prices: list[float]) -> np.ndarray:
+    """Daily returns as a float array (empty with fewer than 2 prices)."""
+    if len(prices) < 2:
+        return np.empty(0)
+    
+    prices_arr = np.asarray(prices, dtype=float)
+    returns = np.diff(prices_arr)
+    returns /= prices_arr[:-1]
+    return returns
+
+
 def calculate_returns(prices: list[float]) -> list[float]:
     """
     Calculate daily returns from a list of prices.
@@ -16,12 +27,7 @@ def calculate_returns(prices: list[float]) -> list[float]:
     Returns:
         List of daily returns (percentage changes)
     """
-    if len(prices) < 2:
-        return []
-    
-    prices_arr = np.array(prices)
-    returns = np.diff(prices_arr) / prices_arr[:-1]
-    return returns.tolist()
+    return _returns_array(prices).tolist()
 
 
 def calculate_volatility(prices: list[float]) -> float:
@@ -34,12 +40,12 @@ def calculate_volatility(prices: list[float]) -> float:
     Returns:
         Annualized volatility as a decimal (e.g., 0.25 = 25%)
     """
-    returns = calculate_returns(prices)
+    returns = _returns_array(prices)
     if len(returns) < 2:
         return 0.0
     
     # Daily volatility
-    daily_vol = np.std(returns)
+    daily_vol = returns.std()
     
     # Annualize (assuming 252 trading days)
     annualized_vol = daily_vol * np.sqrt(252)
@@ -47,6 +53,46 @@ def calculate_volatility(prices: list[float]) -> float:
     return float(annualized_vol)
 
 
+def _returns_and_volatilities(
+    price_series: list[list[float]]
+) -> tuple[list[Optional[np.ndarray]], list[float]]:
+    """
+    Daily returns and annualized volatility for several price series at once.
+    
+    Series of the same length are stacked into one (n_assets, n_days) matrix,
+    so each length costs one diff and one std instead of one per asset.
+    Per asset the results match calculate_returns and calculate_volatility.
+    
+    Args:
+        price_series: Historical prices per asset (oldest to newest)
+        
+    Returns:
+        Tuple of (returns array per asset, None with fewer than 2 prices;
+        annualized volatility per asset, 0.0 with fewer than 3 prices)
+    """
+    returns: list[Optional[np.ndarray]] = [None] * len(price_series)
+    volatilities = [0.0] * len(price_series)
+    
+    by_length: dict[int, list[int]] = {}
+    for i, prices in enumerate(price_series):
+        by_length.setdefault(len(prices), []).append(i)
+    
+    for length, indices in by_length.items():
+        if length < 2:
+            continue
+        prices_arr = np.array([price_series[i] for i in indices], dtype=float)
+        returns_arr = np.diff(prices_arr, axis=1)
+        returns_arr /= prices_arr[:, :-1]
+        for i, row in zip(indices, returns_arr):
+            returns[i] = row
+        if length >= 3:
+            annualized = returns_arr.std(axis=1) * np.sqrt(252)
+            for i, vol in zip(indices, annualized.tolist()):
+                volatilities[i] = vol
+    
+    return returns, volatilities
+
+
 def calculate_hhi(weights: list[float]) -> float:
     """
     Calculate Herfindahl-Hirschman Index for concentration risk.
@@ -55,27 +101,40 @@ def calculate_hhi(weights: list[float]) -> float:
     - 1/n (perfectly diversified) to 1.0 (completely concentrated)
     
     Args:
-        weights: List of portfolio weights (should sum to 1.0)
+        weights: Portfolio weights as a list or array (should sum to 1.0)
         
     Returns:
         HHI value between 0 and 1
     """
-    if not weights:
+    weights_arr = np.asarray(weights, dtype=float)
+    if not weights_arr.size:
         return 0.0
     
-    weights_arr = np.array(weights)
-    
-    # Normalize weights to sum to 1
     total = weights_arr.sum()
-    if total > 0:
-        weights_arr = weights_arr / total
-    else:
+    if not total > 0:
         return 0.0
     
-    # Calculate HHI
-    hhi = np.sum(weights_arr ** 2)
+    # HHI of the normalized weights: sum(w^2) / sum(w)^2, no normalized copy needed
+    return float((weights_arr @ weights_arr) / (total * total))
+
+
+def _pairwise_corr_from_returns(returns_arr: np.ndarray) -> np.ndarray:
+    """
+    Correlation matrix of the rows of a returns matrix.
+    
+    Centers each row and scales it to unit length, so the whole matrix is a
+    single matrix product instead of np.corrcoef's covariance-then-divide.
+    Rows with no variance come out as NaN, as with np.corrcoef.
     
-    return float(hhi)
+    Args:
+        returns_arr: (n_assets, n_days) array of returns
+        
+    Returns:
+        (n_assets, n_assets) correlation matrix clipped to [-1, 1]
+    """
+    centered = returns_arr - returns_arr.mean(axis=1, keepdims=True)
+    centered /= np.linalg.norm(centered, axis=1, keepdims=True)
+    return np.clip(centered @ centered.T, -1.0, 1.0)
 
 
 def calculate_correlation(returns_matrix: list[list[float]]) -> float:
@@ -92,36 +151,32 @@ def calculate_correlation(returns_matrix: list[list[float]]) -> float:
         return 0.0
     
     # Ensure all return series have the same length
-    min_len = min(len(r) for r in returns_matrix if r)
+    min_len = min(len(r) for r in returns_matrix if len(r))
     if min_len < 2:
         return 0.0
     
     # Trim returns to same length
-    trimmed = [r[:min_len] for r in returns_matrix if r]
+    trimmed = [r[:min_len] for r in returns_matrix if len(r)]
     if len(trimmed) < 2:
         return 0.0
     
     # Calculate correlation matrix
-    returns_arr = np.array(trimmed)
-    corr_matrix = np.corrcoef(returns_arr)
+    returns_arr = np.array(trimmed, dtype=float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        corr_matrix = _pairwise_corr_from_returns(returns_arr)
     
     # Handle NaN values
     corr_matrix = np.nan_to_num(corr_matrix, nan=0.0)
     
     # Extract upper triangle (excluding diagonal)
-    n = len(corr_matrix)
-    upper_triangle = []
-    for i in range(n):
-        for j in range(i + 1, n):
-            upper_triangle.append(abs(corr_matrix[i, j]))
+    upper_rows, upper_cols = np.triu_indices(corr_matrix.shape[0], k=1)
+    upper_triangle = np.abs(corr_matrix[upper_rows, upper_cols])
     
-    if not upper_triangle:
+    if not upper_triangle.size:
         return 0.0
     
     # Return average correlation
-    avg_corr = np.mean(upper_triangle)
-    
-    return float(avg_corr)
+    return float(upper_triangle.mean())
 
 
 def calculate_risk_score(
@@ -183,45 +238,29 @@ def analyze_portfolio_risk(enriched_holdings: list[dict]) -> dict:
             "error": "Empty portfolio"
         }
     
-    # Calculate portfolio values and weights
-    total_value = 0
-    holdings_with_value = []
+    # Calculate portfolio values and weights as arrays; per-holding dicts are
+    # only built for the output below
+    values = np.fromiter(
+        (holding.get("current_price", 0) * holding.get("quantity", 0) for holding in enriched_holdings),
+        dtype=float,
+        count=len(enriched_holdings)
+    )
+    total_value = float(values.sum())
+    if total_value > 0:
+        weights = values / total_value
+    else:
+        weights = np.zeros_like(values)
     
-    for holding in enriched_holdings:
-        current_price = holding.get("current_price", 0)
-        quantity = holding.get("quantity", 0)
-        value = current_price * quantity
-        
-        holdings_with_value.append({
-            **holding,
-            "value": value
-        })
-        total_value += value
-    
-    # Calculate weights
-    weights = []
-    for holding in holdings_with_value:
-        if total_value > 0:
-            weight = holding["value"] / total_value
-        else:
-            weight = 0
-        holding["weight"] = weight
-        weights.append(weight)
-    
-    # Calculate portfolio volatility (weighted average)
-    individual_volatilities = []
-    all_returns = []
-    
-    for holding in holdings_with_value:
-        historical_prices = holding.get("historical_prices", [])
-        if historical_prices:
-            vol = calculate_volatility(historical_prices)
-            individual_volatilities.append(vol * holding["weight"])
-            returns = calculate_returns(historical_prices)
-            if returns:
-                all_returns.append(returns)
-    
-    portfolio_volatility = sum(individual_volatilities) if individual_volatilities else 0.0
+    # Returns and volatility for every holding in one batched pass; both the
+    # portfolio figures and holdings_analysis below reuse them
+    holding_returns, holding_vols = _returns_and_volatilities(
+        [holding.get("historical_prices", []) for holding in enriched_holdings]
+    )
+    
+    # Calculate portfolio volatility (weighted average); holdings without enough
+    # history have a volatility of 0.0 and drop out of the dot product
+    portfolio_volatility = float(np.dot(weights, holding_vols))
+    all_returns = [returns for returns in holding_returns if returns is not None]
     
     # Calculate concentration (HHI)
     concentration = calculate_hhi(weights)
@@ -232,6 +271,20 @@ def analyze_portfolio_risk(enriched_holdings: list[dict]) -> dict:
     # Calculate overall risk score
     risk_score = calculate_risk_score(portfolio_volatility, concentration, correlation_risk)
     
+    # Per-holding summary, tracking the largest position on the way
+    holdings_analysis = []
+    largest_holding = None
+    for h, value, weight, vol in zip(enriched_holdings, values.tolist(), weights.tolist(), holding_vols):
+        entry = {
+            "symbol": h.get("symbol"),
+            "value": round(value, 2),
+            "weight": round(weight * 100, 2),
+            "individual_volatility": round(vol, 4)
+        }
+        holdings_analysis.append(entry)
+        if largest_holding is None or entry["value"] > largest_holding["value"]:
+            largest_holding = entry
+    
     return {
         "risk_score": risk_score,
         "risk_breakdown": {
@@ -240,15 +293,6 @@ def analyze_portfolio_risk(enriched_holdings: list[dict]) -> dict:
             "correlation_risk": round(correlation_risk, 4)
         },
         "total_value": round(total_value, 2),
-        "holdings_analysis": [
-            {
-                "symbol": h.get("symbol"),
-                "value": round(h.get("value", 0), 2),
-                "weight": round(h.get("weight", 0) * 100, 2),
-                "individual_volatility": round(
-                    calculate_volatility(h.get("historical_prices", [])), 4
-                )
-            }
-            for h in holdings_with_value
-        ]
+        "holdings_analysis": holdings_analysis,
+        "largest_holding": largest_holding
     }
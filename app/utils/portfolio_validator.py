@@ -3,24 +3,24 @@ Portfolio validation and CSV parsing utilities.
 """
 import io
 import csv
-from typing import Optional
+from typing import Annotated, Optional, TextIO, Union
 from datetime import datetime
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, StringConstraints, field_validator
 from typing import List
 
+# Uppercased and stripped by pydantic-core itself, no Python validator needed
+TickerSymbol = Annotated[str, StringConstraints(strip_whitespace=True, to_upper=True)]
+
 
 class Holding(BaseModel):
     """Single holding in a portfolio."""
-    symbol: str = Field(..., min_length=1, max_length=20, description="Stock ticker symbol")
+    symbol: TickerSymbol = Field(..., min_length=1, max_length=20, description="Stock ticker symbol")
     quantity: float = Field(..., gt=0, description="Number of shares")
     purchase_price: float = Field(..., ge=0, description="Purchase price per share")
     purchase_date: Optional[str] = Field(None, description="Purchase date (YYYY-MM-DD)")
     
-    @validator('symbol')
-    def uppercase_symbol(cls, v):
-        return v.upper().strip()
-    
-    @validator('purchase_date')
+    @field_validator('purchase_date')
+    @classmethod
     def validate_date(cls, v):
         if v:
             try:
@@ -32,10 +32,11 @@ class Holding(BaseModel):
 
 class Portfolio(BaseModel):
     """Portfolio containing multiple holdings."""
-    holdings: List[Holding] = Field(..., min_items=1, description="List of holdings")
+    holdings: List[Holding] = Field(..., min_length=1, description="List of holdings")
     user_profile: str = Field("beginner", description="User profile: 'beginner' or 'senior'")
     
-    @validator('user_profile')
+    @field_validator('user_profile')
+    @classmethod
     def validate_profile(cls, v):
         v = v.lower().strip()
         if v not in ["beginner", "senior", "intermediate"]:
@@ -54,7 +55,7 @@ def validate_portfolio(portfolio_data: dict) -> tuple[bool, Optional[Portfolio],
         Tuple of (is_valid, parsed_portfolio, error_message)
     """
     try:
-        portfolio = Portfolio(**portfolio_data)
+        portfolio = Portfolio.model_validate(portfolio_data)
         return True, portfolio, None
     except Exception as e:
         error_msg = str(e)
@@ -64,7 +65,39 @@ def validate_portfolio(portfolio_data: dict) -> tuple[bool, Optional[Portfolio],
         return False, None, error_msg
 
 
-def parse_csv_portfolio(csv_content: str) -> tuple[bool, list[dict], Optional[str]]:
+def _csv_column_roles(fieldnames: list[str]) -> list[tuple[str, int]]:
+    """
+    Work out once which header columns hold the symbol, quantity, price and date.
+    
+    Matching is case-insensitive and follows csv.DictReader: a repeated header
+    name reads its last column but keeps the position of its first.
+    
+    Args:
+        fieldnames: Header row of the CSV
+        
+    Returns:
+        List of (role, column_index) in the order cells are read; other columns are left out
+    """
+    # Header name -> index of its last column, in first-occurrence order
+    last_index = {}
+    for index, name in enumerate(fieldnames):
+        last_index[name] = index
+    
+    roles = []
+    for name, index in last_index.items():
+        key_lower = name.lower().strip()
+        if "symbol" in key_lower or key_lower == "ticker":
+            roles.append(("symbol", index))
+        elif "quantity" in key_lower or key_lower == "shares" or key_lower == "qty":
+            roles.append(("quantity", index))
+        elif "price" in key_lower or key_lower == "purchase_price":
+            roles.append(("price", index))
+        elif "date" in key_lower:
+            roles.append(("date", index))
+    return roles
+
+
+def parse_csv_portfolio(csv_content: Union[str, TextIO]) -> tuple[bool, list[dict], Optional[str]]:
     """
     Parse CSV content into portfolio holdings.
     
@@ -73,47 +106,60 @@ def parse_csv_portfolio(csv_content: str) -> tuple[bool, list[dict], Optional[st
     AAPL,10,150.00,2024-01-15
     
     Args:
-        csv_content: CSV file content as string
+        csv_content: CSV file content as a string, or a text file object
+            that is read row by row
         
     Returns:
         Tuple of (is_valid, holdings_list, error_message)
     """
     try:
         # Parse CSV
-        reader = csv.DictReader(io.StringIO(csv_content))
+        if isinstance(csv_content, str):
+            csv_content = io.StringIO(csv_content)
+        reader = csv.reader(csv_content)
+        
+        # Header row; columns are matched to fields once here rather than per cell
+        fieldnames = next(reader, None)
+        roles = _csv_column_roles(fieldnames) if fieldnames else []
+        field_count = len(fieldnames) if fieldnames else 0
+        
         holdings = []
         row_num = 1  # Start from 1 for header
         
         for row in reader:
+            if not row:
+                continue
             row_num += 1
             
-            # Try to find columns (case-insensitive)
             symbol = None
             quantity = None
             purchase_price = None
             purchase_date = None
             
-            for key, value in row.items():
-                key_lower = key.lower().strip()
-                value = value.strip() if value else ""
+            for role, index in roles:
+                # Short rows read as empty cells
+                value = row[index].strip() if index < len(row) else ""
                 
-                if "symbol" in key_lower or key_lower == "ticker":
+                if role == "symbol":
                     symbol = value.upper()
-                elif "quantity" in key_lower or key_lower == "shares" or key_lower == "qty":
+                elif role == "quantity":
                     try:
                         quantity = float(value)
                     except ValueError:
                         return False, [], f"Row {row_num}: Invalid quantity '{value}'"
-                elif "price" in key_lower or key_lower == "purchase_price":
+                elif role == "price":
                     try:
                         # Remove currency symbols
                         value = value.replace("$", "").replace(",", "")
                         purchase_price = float(value)
                     except ValueError:
                         return False, [], f"Row {row_num}: Invalid price '{value}'"
-                elif "date" in key_lower:
+                else:
                     purchase_date = value if value else None
             
+            if len(row) > field_count:
+                return False, [], f"Row {row_num}: More values than header columns"
+            
             # Validate required fields
             if not symbol:
                 return False, [], f"Row {row_num}: Missing symbol"
@@ -3,16 +3,41 @@ Price fetching utilities using Alpha Vantage API.
 Includes caching to avoid rate limits on free tier.
 """
 import os
+import time
+import asyncio
 import requests
-from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
-from functools import lru_cache
+from functools import lru_cache, partial
 
 # Alpha Vantage API endpoint
 ALPHA_VANTAGE_BASE_URL = "https://www.alphavantage.co/query"
 
-# Cache for storing price data (simulates API calls for demo)
-_price_cache: dict = {}
+# One keep-alive session for all Alpha Vantage calls so repeat requests skip the TCP/TLS handshake
+PRICE_FETCH_POOL_SIZE = 10
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(
+    pool_connections=PRICE_FETCH_POOL_SIZE,
+    pool_maxsize=PRICE_FETCH_POOL_SIZE,
+    max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+))
+
+# Price requests run concurrently, one worker per pooled connection
+_fetch_pool = ThreadPoolExecutor(max_workers=PRICE_FETCH_POOL_SIZE, thread_name_prefix="price-fetch")
+
+# Live lookups are memoized per fixed 5-minute window
+PRICE_CACHE_SECONDS = 300
+
+
+class _Uncached(Exception):
+    """Carries a fetch result that must not be memoized (errors and mock fallbacks)."""
+    
+    def __init__(self, result: dict):
+        super().__init__(result.get("error", ""))
+        self.result = result
+
 
 # Mock data for testing (to avoid API rate limits)
 MOCK_PRICES = {
@@ -32,6 +57,19 @@ MOCK_PRICES = {
 }
 
 
+def _extend_mock_history(base_prices: list[float], days: int) -> list[float]:
+    """Repeat a mock history out to `days` points with a small periodic variance."""
+    return [base_prices[i % len(base_prices)] + (i % 5 - 2) * 0.5 for i in range(days)]
+
+
+# Mock histories extended once at import; requests up to this many days are a slice
+MOCK_HISTORY_DAYS = 100
+_MOCK_HISTORICAL = {
+    symbol: _extend_mock_history(data["history"], MOCK_HISTORY_DAYS)
+    for symbol, data in MOCK_PRICES.items()
+}
+
+
 def get_api_key() -> str:
     """Get Alpha Vantage API key from environment."""
     return os.getenv("ALPHA_VANTAGE_API_KEY", "")
@@ -59,13 +97,6 @@ def fetch_current_price(symbol: str, use_mock: bool = True) -> dict:
             "source": "mock"
         }
     
-    # Check cache first
-    cache_key = f"{symbol}_current"
-    if cache_key in _price_cache:
-        cache_entry = _price_cache[cache_key]
-        if datetime.now() - cache_entry["timestamp"] < timedelta(minutes=5):
-            return cache_entry["data"]
-    
     # Call Alpha Vantage API
     api_key = get_api_key()
     if not api_key:
@@ -75,57 +106,61 @@ def fetch_current_price(symbol: str, use_mock: bool = True) -> dict:
             "error": "Alpha Vantage API key not configured"
         }
     
+    # Successful lookups are cached until the 5-minute window rolls over
+    try:
+        return _fetch_current_price_live(symbol, api_key, int(time.time()) // PRICE_CACHE_SECONDS)
+    except _Uncached as e:
+        return e.result
+
+
+@lru_cache(maxsize=512)
+def _fetch_current_price_live(symbol: str, api_key: str, window: int) -> dict:
+    """Call GLOBAL_QUOTE; results that shouldn't be cached are raised as _Uncached."""
     try:
         params = {
             "function": "GLOBAL_QUOTE",
             "symbol": symbol,
             "apikey": api_key
         }
-        response = requests.get(ALPHA_VANTAGE_BASE_URL, params=params, timeout=10)
+        response = _session.get(ALPHA_VANTAGE_BASE_URL, params=params, timeout=10)
         response.raise_for_status()
         data = response.json()
         
         if "Global Quote" in data and "05. price" in data["Global Quote"]:
             price = float(data["Global Quote"]["05. price"])
-            result = {
+            return {
                 "status": "success",
                 "symbol": symbol,
                 "price": price,
                 "source": "alpha_vantage"
             }
-            # Cache the result
-            _price_cache[cache_key] = {
-                "timestamp": datetime.now(),
-                "data": result
-            }
-            return result
         else:
             # Check if rate limited
             if "Note" in data or "Information" in data:
                 # Fall back to mock if available
                 if symbol in MOCK_PRICES:
-                    return {
+                    raise _Uncached({
                         "status": "success",
                         "symbol": symbol,
                         "price": MOCK_PRICES[symbol]["current"],
                         "source": "mock_fallback"
-                    }
-                return {
+                    })
+                raise _Uncached({
                     "status": "error",
                     "symbol": symbol,
                     "error": "API rate limit exceeded"
-                }
-            return {
+                })
+            raise _Uncached({
                 "status": "error",
                 "symbol": symbol,
                 "error": f"No price data available for {symbol}"
-            }
+            })
     except requests.RequestException as e:
-        return {
+        raise _Uncached({
             "status": "error",
             "symbol": symbol,
             "error": f"API request failed: {str(e)}"
-        }
+        })
 
 
 def fetch_historical_prices(symbol: str, days: int = 30, use_mock: bool = True) -> dict:
@@ -144,17 +179,15 @@ def fetch_historical_prices(symbol: str, days: int = 30, use_mock: bool = True)
     
     # Use mock data for demo/testing
     if use_mock and symbol in MOCK_PRICES:
-        # Extend mock data with some variance
-        base_prices = MOCK_PRICES[symbol]["history"]
-        extended_prices = []
-        for i in range(days):
-            idx = i % len(base_prices)
-            variance = (i % 5 - 2) * 0.5  # Small variance
-            extended_prices.append(base_prices[idx] + variance)
+        # Extend mock data with some variance (precomputed for the usual window sizes)
+        if days <= MOCK_HISTORY_DAYS:
+            extended_prices = _MOCK_HISTORICAL[symbol][:max(days, 0)]
+        else:
+            extended_prices = _extend_mock_history(MOCK_PRICES[symbol]["history"], days)
         return {
             "status": "success",
             "symbol": symbol,
-            "prices": extended_prices[-days:],
+            "prices": extended_prices,
             "source": "mock"
         }
     
@@ -167,6 +200,17 @@ def fetch_historical_prices(symbol: str, days: int = 30, use_mock: bool = True)
             "error": "Alpha Vantage API key not configured"
         }
     
+    # Successful lookups are cached until the 5-minute window rolls over; the
+    # latest close doubles as the current price in fetch_price_bundle
+    try:
+        return _fetch_historical_prices_live(symbol, days, api_key, int(time.time()) // PRICE_CACHE_SECONDS)
+    except _Uncached as e:
+        return e.result
+
+
+@lru_cache(maxsize=512)
+def _fetch_historical_prices_live(symbol: str, days: int, api_key: str, window: int) -> dict:
+    """Call TIME_SERIES_DAILY; results that shouldn't be cached are raised as _Uncached."""
     try:
         params = {
             "function": "TIME_SERIES_DAILY",
@@ -174,7 +218,7 @@ def fetch_historical_prices(symbol: str, days: int = 30, use_mock: bool = True)
             "outputsize": "compact",  # Last 100 data points
             "apikey": api_key
         }
-        response = requests.get(ALPHA_VANTAGE_BASE_URL, params=params, timeout=15)
+        response = _session.get(ALPHA_VANTAGE_BASE_URL, params=params, timeout=15)
         response.raise_for_status()
         data = response.json()
         
@@ -194,23 +238,71 @@ def fetch_historical_prices(symbol: str, days: int = 30, use_mock: bool = True)
             # Fall back to mock if available
             if symbol in MOCK_PRICES:
                 base_prices = MOCK_PRICES[symbol]["history"]
-                return {
+                raise _Uncached({
                     "status": "success",
                     "symbol": symbol,
                     "prices": base_prices,
                     "source": "mock_fallback"
-                }
-            return {
+                })
+            raise _Uncached({
                 "status": "error",
                 "symbol": symbol,
                 "error": f"No historical data available for {symbol}"
-            }
+            })
     except requests.RequestException as e:
-        return {
+        raise _Uncached({
             "status": "error",
             "symbol": symbol,
             "error": f"API request failed: {str(e)}"
+        })
+
+
+def fetch_price_bundle(symbol: str, days: int = 30, use_mock: bool = True) -> tuple[dict, dict]:
+    """
+    Fetch current price and price history for a symbol with one API call.
+    
+    Live lookups take the current price from the latest TIME_SERIES_DAILY close
+    instead of a separate GLOBAL_QUOTE request. When the API returns no series
+    the current price falls back to mock data like the history does; other
+    failures report the history's error.
+    
+    Args:
+        symbol: Stock ticker symbol
+        days: Number of days of history to fetch
+        use_mock: If True, use mock data to avoid API rate limits
+        
+    Returns:
+        Tuple of (current price result, historical result), shaped like the
+        results of fetch_current_price and fetch_historical_prices
+    """
+    symbol = symbol.upper().strip()
+    
+    # Mock data needs no API call
+    if use_mock and symbol in MOCK_PRICES:
+        return fetch_current_price(symbol, use_mock), fetch_historical_prices(symbol, days, use_mock)
+    
+    historical_result = fetch_historical_prices(symbol, days, use_mock)
+    if historical_result.get("source") == "alpha_vantage" and historical_result["prices"]:
+        current_result = {
+            "status": "success",
+            "symbol": symbol,
+            "price": historical_result["prices"][-1],
+            "source": "alpha_vantage"
         }
+    elif historical_result.get("source") == "mock_fallback":
+        current_result = {
+            "status": "success",
+            "symbol": symbol,
+            "price": MOCK_PRICES[symbol]["current"],
+            "source": "mock_fallback"
+        }
+    else:
+        current_result = {
+            "status": "error",
+            "symbol": symbol,
+            "error": historical_result.get("error", f"No price data available for {symbol}")
+        }
+    return current_result, historical_result
 
 
 def enrich_portfolio_with_prices(holdings: list[dict], use_mock: bool = True) -> list[dict]:
@@ -224,26 +316,63 @@ def enrich_portfolio_with_prices(holdings: list[dict], use_mock: bool = True) ->
     Returns:
         List of enriched holdings with current_price and historical_prices
     """
-    enriched = []
-    for holding in holdings:
-        symbol = holding.get("symbol", "").upper()
-        enriched_holding = dict(holding)
-        
-        # Fetch current price
-        current_result = fetch_current_price(symbol, use_mock)
-        if current_result["status"] == "success":
-            enriched_holding["current_price"] = current_result["price"]
-        else:
-            enriched_holding["current_price"] = holding.get("purchase_price", 0)
-            enriched_holding["price_error"] = current_result.get("error")
-        
-        # Fetch historical prices
-        historical_result = fetch_historical_prices(symbol, days=30, use_mock=use_mock)
-        if historical_result["status"] == "success":
-            enriched_holding["historical_prices"] = historical_result["prices"]
-        else:
-            enriched_holding["historical_prices"] = []
+    symbols = [holding.get("symbol", "").upper() for holding in holdings]
+    
+    # Blocking HTTP, so one bundle request per symbol is submitted to the pool
+    # up front; map keeps input order
+    bundles = _fetch_pool.map(
+        lambda symbol: fetch_price_bundle(symbol, days=30, use_mock=use_mock), symbols
+    )
+    
+    return [
+        _enrich_holding(holding, current_result, historical_result)
+        for holding, (current_result, historical_result) in zip(holdings, bundles)
+    ]
+
+
+async def enrich_portfolio_with_prices_async(holdings: list[dict], use_mock: bool = True) -> list[dict]:
+    """
+    Async variant of enrich_portfolio_with_prices for use on the API's event loop.
+    
+    The blocking fetches are handed to the price-fetch pool and awaited together,
+    so no event-loop or default-executor thread sits waiting on the network.
+    
+    Args:
+        holdings: List of holding dicts with 'symbol', 'quantity', 'purchase_price'
+        use_mock: If True, use mock data
         
-        enriched.append(enriched_holding)
+    Returns:
+        List of enriched holdings with current_price and historical_prices
+    """
+    loop = asyncio.get_running_loop()
+    symbols = [holding.get("symbol", "").upper() for holding in holdings]
+    
+    bundles = await asyncio.gather(*(
+        loop.run_in_executor(_fetch_pool, partial(fetch_price_bundle, symbol, days=30, use_mock=use_mock))
+        for symbol in symbols
+    ))
+    
+    return [
+        _enrich_holding(holding, current_result, historical_result)
+        for holding, (current_result, historical_result) in zip(holdings, bundles)
+    ]
+
+
+def _enrich_holding(holding: dict, current_result: dict, historical_result: dict) -> dict:
+    """Copy one holding and add its fetched current price and price history."""
+    enriched_holding = dict(holding)
+    
+    # Current price, falling back to the purchase price
+    if current_result["status"] == "success":
+        enriched_holding["current_price"] = current_result["price"]
+    else:
+        enriched_holding["current_price"] = holding.get("purchase_price", 0)
+        enriched_holding["price_error"] = current_result.get("error")
+    
+    # Historical prices
+    if historical_result["status"] == "success":
+        enriched_holding["historical_prices"] = historical_result["prices"]
+    else:
+        enriched_holding["historical_prices"] = []
     
-    return enriched
+    return enriched_holding
@@ -37,7 +37,7 @@ function ChatWindow({ portfolioData, isOpen, onClose }) {
                 content: msg.content
             }))
 
-            const response = await fetch(`${API_BASE}/chat`, {
+            const response = await fetch(`${API_BASE}/chat/stream`, {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({
@@ -46,20 +46,41 @@ function ChatWindow({ portfolioData, isOpen, onClose }) {
                     chat_history: recentHistory
                 })
             })
+            if (!response.ok || !response.body) throw new Error(`HTTP ${response.status}`)
+
+            // Show the answer as it streams in: the first chunk adds the assistant
+            // message, later chunks grow it
+            const showAnswer = (content) => setMessages(prev => {
+                const last = prev[prev.length - 1]
+                if (last?.streaming) return [...prev.slice(0, -1), { ...last, content }]
+                return [...prev, { role: 'assistant', content, streaming: true }]
+            })
 
-            const data = await response.json()
-
-            if (data.success) {
-                setMessages(prev => [...prev, {
-                    role: 'assistant',
-                    content: data.answer
-                }])
-            } else {
-                setMessages(prev => [...prev, {
-                    role: 'assistant',
-                    content: data.answer || "Sorry, I couldn't process your question. Please try again."
-                }])
+            const reader = response.body.getReader()
+            const decoder = new TextDecoder()
+            let buffer = ''
+            let answer = ''
+            while (true) {
+                const { value, done } = await reader.read()
+                if (done) break
+                buffer += decoder.decode(value, { stream: true })
+                // Server-Sent Events are separated by a blank line
+                const events = buffer.split('\n\n')
+                buffer = events.pop()
+                for (const event of events) {
+                    if (!event.startsWith('data: ')) continue
+                    const data = JSON.parse(event.slice(6))
+                    if (data.token) {
+                        answer += data.token
+                        showAnswer(answer)
+                    } else if (data.error) {
+                        answer = data.answer || "Sorry, I couldn't process your question. Please try again."
+                        showAnswer(answer)
+                    }
+                }
             }
+
+            if (!answer) showAnswer("Sorry, I couldn't process your question. Please try again.")
         } catch (error) {
             console.error('Chat error:', error)
             setMessages(prev => [...prev, {
@@ -67,6 +88,7 @@ function ChatWindow({ portfolioData, isOpen, onClose }) {
                 content: "Sorry, there was an error connecting to the server. Please try again."
             }])
         } finally {
+            setMessages(prev => prev.map(msg => msg.streaming ? { role: msg.role, content: msg.content } : msg))
             setLoading(false)
         }
     }
@@ -99,7 +121,7 @@ function ChatWindow({ portfolioData, isOpen, onClose }) {
                             </div>
                         </div>
                     ))}
-                    {loading && (
+                    {loading && !messages[messages.length - 1]?.streaming && (
                         <div className="message assistant">
                             <div className="message-content typing">
                                 <span></span><span></span><span></span>